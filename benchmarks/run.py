@@ -0,0 +1,240 @@
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import tempfile
+import sqlalchemy
+from src.database import DatabaseHandler, PAGE_SIZE, SEED_BATCH_SIZE
+from src.search import BookQuery
+
+DEFAULT_SIZES = [1000, 100000, 1000000]
+SINGLE_INSERTS = 500
+LOOKUPS = 1000
+
+WORDS = (
+    "river shadow garden winter empire silent glass letter stone night "
+    "ocean story city light north crown house paper fire journey"
+).split()
+AUTHORS = [
+    f"{first} {last}"
+    for first in ("Ana", "Budi", "Citra", "Dewi", "Eko", "Fajar", "Gita", "Hadi")
+    for last in ("Santoso", "Wijaya", "Pratama", "Lestari", "Nugroho", "Putri")
+]
+
+
+def book_rows(count, start=0, seed=42):
+    rng = random.Random(seed + start)
+    for number in range(start, start + count):
+        yield {
+            "ISBN": f"978{number:010d}",
+            "title": " ".join(rng.choice(WORDS) for _ in range(rng.randint(2, 6))),
+            "author": rng.choice(AUTHORS),
+            "year_published": rng.randint(1900, 2024),
+            "price": rng.randint(1, 1000000),
+        }
+
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+
+def throughput(rows, seconds):
+    return {
+        "rows": rows,
+        "seconds": seconds,
+        "rows_per_second": rows / seconds if seconds else None,
+    }
+
+
+def latency(samples):
+    samples = sorted(samples)
+    return {
+        "count": len(samples),
+        "mean_ms": sum(samples) / len(samples) * 1000,
+        "p50_ms": samples[len(samples) // 2] * 1000,
+        "p95_ms": samples[int(len(samples) * 0.95)] * 1000,
+        "max_ms": samples[-1] * 1000,
+    }
+
+
+def bench_inserts(db_handler, size):
+    rows = list(book_rows(size))
+
+    batched_seconds = 0.0
+    for start in range(0, size, SEED_BATCH_SIZE):
+        seconds, _ = timed(
+            db_handler.insert_books, rows[start : start + SEED_BATCH_SIZE]
+        )
+        batched_seconds += seconds
+
+    single_rows = list(book_rows(min(SINGLE_INSERTS, size), start=size))
+    single_seconds = 0.0
+    for row in single_rows:
+        seconds, _ = timed(
+            db_handler.insert_book,
+            row["ISBN"],
+            row["title"],
+            row["author"],
+            row["year_published"],
+            row["price"],
+        )
+        single_seconds += seconds
+
+    return {
+        "insert_batched": throughput(size, batched_seconds),
+        "insert_single": throughput(len(single_rows), single_seconds),
+    }
+
+
+def bench_reads(db_handler, size):
+    results = {}
+
+    seconds, books = timed(db_handler.load_all_books)
+    results["load_all"] = throughput(len(books), seconds)
+    del books
+
+    seconds, page = timed(db_handler.load_books_page)
+    results["first_page"] = {"rows": len(page), "ms": seconds * 1000}
+
+    samples = []
+    rows = 0
+    last_isbn = None
+    while True:
+        seconds, page = timed(db_handler.load_books_page, last_isbn, PAGE_SIZE)
+        samples.append(seconds)
+        rows += len(page)
+        if len(page) < PAGE_SIZE:
+            break
+        last_isbn = page[-1].ISBN
+    results["paged_load"] = {
+        **throughput(rows, sum(samples)),
+        "page": latency(samples),
+    }
+
+    rng = random.Random(7)
+    isbns = [f"978{rng.randrange(size):010d}" for _ in range(LOOKUPS)]
+    db_handler.book_cache.clear()
+    results["lookup_cold"] = latency(
+        [timed(db_handler.load_book_by_isbn, isbn)[0] for isbn in isbns]
+    )
+    results["lookup_warm"] = latency(
+        [timed(db_handler.load_book_by_isbn, isbn)[0] for isbn in isbns]
+    )
+
+    queries = {
+        "search_text": BookQuery(text="winter"),
+        "search_year_range": BookQuery(year_min=1990, year_max=1999, sort_by="year"),
+        "search_price_sorted": BookQuery(price_max=50000, sort_by="price"),
+        "search_author": BookQuery(author="Wijaya", sort_by="author"),
+    }
+    for name, query in queries.items():
+        seconds, page = timed(db_handler.search_books, query)
+        results[name] = {"rows": len(page), "ms": seconds * 1000}
+
+    return results
+
+
+def bench_first_paint(db_handler):
+    try:
+        os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+        from PyQt5.QtWidgets import QApplication
+        from src.app import BookManagementSystem
+    except ImportError as e:
+        return {"skipped": str(e)}
+
+    app = QApplication.instance() or QApplication(sys.argv[:1])
+    window = BookManagementSystem()
+    window.db_handler = db_handler
+    window.show()
+
+    start = time.perf_counter()
+    window.show_main_page()
+    while window.book_model.is_fetching():
+        app.processEvents()
+    window.book_table.viewport().repaint()
+    app.processEvents()
+    seconds = time.perf_counter() - start
+
+    result = {"ms": seconds * 1000, "rows": window.book_model.rowCount()}
+    window.close()
+    db_handler.remove_change_listener(window.change_notifier.notify)
+    return result
+
+
+def bench_delete_all(db_handler, rows):
+    seconds, _ = timed(db_handler.delete_all_books)
+    return throughput(rows, seconds)
+
+
+def run_size(url, size, skip_view):
+    cleanup = None
+    if url is None:
+        handle, path = tempfile.mkstemp(suffix=".db", prefix="pyqtlms-bench-")
+        os.close(handle)
+        url = f"sqlite:///{path}"
+        cleanup = path
+
+    db_handler = DatabaseHandler(url)
+    try:
+        db_handler.delete_all_books()
+        results = bench_inserts(db_handler, size)
+        results.update(bench_reads(db_handler, size))
+        if not skip_view:
+            results["first_paint"] = bench_first_paint(db_handler)
+        results["delete_all"] = bench_delete_all(
+            db_handler, results["load_all"]["rows"]
+        )
+        return results
+    finally:
+        db_handler.dispose()
+        if cleanup:
+            for suffix in ("", "-wal", "-shm"):
+                if os.path.exists(cleanup + suffix):
+                    os.remove(cleanup + suffix)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.run",
+        description="Benchmark the PyQtLMS database layer and main table view",
+    )
+    parser.add_argument(
+        "--url",
+        help="Database to benchmark against. Its book table is emptied. "
+        "Defaults to a temporary SQLite file per catalogue size.",
+    )
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--output", default="bench_output.json")
+    parser.add_argument("--skip-view", action="store_true")
+    args = parser.parse_args(argv)
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "sqlalchemy": sqlalchemy.__version__,
+            "backend": sqlalchemy.engine.make_url(args.url).get_backend_name()
+            if args.url
+            else "sqlite",
+        },
+        "results": {},
+    }
+
+    for size in args.sizes:
+        print(f"Benchmarking {size} books...", file=sys.stderr)
+        report["results"][str(size)] = run_size(args.url, size, args.skip_view)
+
+    with open(args.output, "w") as output:
+        json.dump(report, output, indent=2)
+    print(f"Results written to {args.output}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
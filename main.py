@@ -1,10 +1,27 @@
+import time
+
+STARTED = time.perf_counter()
+
+import os
 import sys
+import logging
+from PyQt5.QtCore import QTimer
 from PyQt5.QtWidgets import QApplication
+from src.instrumentation import startup
+
+startup.start(STARTED)
 from src.app import BookManagementSystem
 
+startup.mark("imports")
+
 if __name__ == "__main__":
+    logging.basicConfig(level=os.getenv("PYQTLMS_LOG_LEVEL", "WARNING").upper())
     app = QApplication(sys.argv)
     app.setStyle("Fusion")
     main_window = BookManagementSystem()
+    main_window.db_connection_handler.prewarm(main_window.db_executor)
     main_window.show()
+    startup.mark("window")
+    # The first event loop iteration runs once the start screen is painted.
+    QTimer.singleShot(0, startup.finish)
     sys.exit(app.exec_())
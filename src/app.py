@@ -1,29 +1,81 @@
+import os
+from functools import wraps
 from PyQt5.QtWidgets import (
-    QApplication,
     QMainWindow,
     QWidget,
     QVBoxLayout,
     QPushButton,
     QLabel,
-    QTableWidget,
-    QTableWidgetItem,
+    QTableView,
+    QAbstractItemView,
+    QMenu,
+    QCheckBox,
+    QShortcut,
+    QDialog,
     QLineEdit,
     QMessageBox,
-    QScrollArea,
-    QSizePolicy,
     QHeaderView,
     QHBoxLayout,
+    QFormLayout,
+    QTableWidget,
+    QTableWidgetItem,
+)
+from PyQt5.QtCore import Qt, QSize, QTimer
+from PyQt5.QtGui import QKeySequence
+from .components import (
+    DbConnectionHandler,
+    DiagnosticsDialog,
+    BulkEditDialog,
+    BASE_FONT_SIZE,
+    apply_dark_theme,
 )
-from PyQt5.QtCore import Qt, QSize
-from .components import DbConnectionHandler
+from .workers import DbExecutor, ChangeNotifier
+from .utils import validate_book, format_idr
+from .instrumentation import metrics, timed
+
+FONT_RESIZE_DEBOUNCE_MS = 150
+WRITE_FLUSH_DELAY_MS = 2000
+FILTER_DEBOUNCE_MS = 150
+HEALTH_CHECK_INTERVAL_MS = 30000
+HEALTH_CHECK_RETRY_MS = 2000
 
 
 class BookManagementSystem(QMainWindow):
     def __init__(self):
         super().__init__()
         self.db_connection_handler = DbConnectionHandler()
+        self.main_page = None
+        self.dashboard_page = None
+        self.db_executor = DbExecutor(parent=self)
+        self.change_notifier = ChangeNotifier(self)
+        self.diagnostics_dialog = None
+        self.write_batcher = None
+
+        self.font_resize_timer = QTimer(self)
+        self.font_resize_timer.setSingleShot(True)
+        self.font_resize_timer.setInterval(FONT_RESIZE_DEBOUNCE_MS)
+        self.font_resize_timer.timeout.connect(self.adjustFontSizes)
+
+        self.write_flush_timer = QTimer(self)
+        self.write_flush_timer.setSingleShot(True)
+        self.write_flush_timer.setInterval(WRITE_FLUSH_DELAY_MS)
+        self.write_flush_timer.timeout.connect(self.save_pending_changes)
+
+        self.filter_timer = QTimer(self)
+        self.filter_timer.setSingleShot(True)
+        self.filter_timer.setInterval(FILTER_DEBOUNCE_MS)
+        self.filter_timer.timeout.connect(self.apply_quick_filter)
+
+        self.database_online = True
+        self.health_timer = QTimer(self)
+        self.health_timer.setSingleShot(True)
+        self.health_timer.timeout.connect(self.check_connection)
+
         self.setup_base_window()
 
+        diagnostics_shortcut = QShortcut(QKeySequence("F12"), self)
+        diagnostics_shortcut.activated.connect(self.show_diagnostics)
+
     def setup_base_window(self):
         self.setWindowTitle("Library Management System")
         self.setMinimumSize(QSize(1800, 1200))
@@ -41,13 +93,9 @@ class BookManagementSystem(QMainWindow):
         self.main_layout.addWidget(self.banner_label)
         self.main_layout.addWidget(self.start_button)
 
+        apply_dark_theme()
         self.setStyleSheet(
             """
-            *{
-                background-color: #2e2e2e;
-                color: #ffffff;
-                font-size: 16pt;
-            }
             QDialog {
                 border: 1px solid #555555;
             }
@@ -57,10 +105,13 @@ class BookManagementSystem(QMainWindow):
                 border-radius: 4px;
                 background-color: #424242;
             }
-            QTableWidget,
-            QTableWidget::item {
+            QTableView,
+            QTableView::item {
                 border: 1px solid #555555;
             }
+            QTableView {
+                background-color: #2e2e2e;
+            }
             QHeaderView::section {
                 background-color: #2e2e2e;
                 color: #ffffff;
@@ -113,82 +164,465 @@ class BookManagementSystem(QMainWindow):
 
         return line_edit
 
-    def create_scroll_area(self, widget):
-        scroll_area = QScrollArea()
-        scroll_area.setWidgetResizable(True)
-        widget.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
-        scroll_area.setWidget(widget)
-        return scroll_area
-
     def resizeEvent(self, event):
-        self.adjustFontSizes()
+        # Restarting the timer coalesces a drag-resize into one font update.
+        self.font_resize_timer.start()
         super().resizeEvent(event)
 
+    @timed("ui.adjust_font_sizes")
     def adjustFontSizes(self):
-        base_font_size = max(8, self.width() // 100)
-        font = QApplication.font()
+        base_font_size = max(BASE_FONT_SIZE, self.width() // 100)
+        if base_font_size == self.font().pointSize():
+            return
+
+        font = self.font()
         font.setPointSize(base_font_size)
-        QApplication.setFont(font)
+        self.setFont(font)
 
+    @timed("ui.show_main_page")
     def show_main_page(self):
         self.clear_layout()
 
-        if books := self.db_handler.load_all_books():
-            table = QTableWidget(len(books), 6)
-            table.setHorizontalHeaderLabels(
-                ["ISBN", "Title", "Author", "Year", "Price", "Actions"]
+        if self.main_page is None:
+            self.main_page = self.build_main_page()
+
+        self.main_layout.addWidget(self.main_page, 1)
+        self.main_page.show()
+
+    @timed("ui.build_main_page")
+    def build_main_page(self):
+        from .table_model import BookTableModel, BookFilterProxyModel
+        from .write_batcher import WriteBatcher
+
+        self.write_batcher = WriteBatcher(self.db_handler)
+        self.book_model = BookTableModel(
+            self.db_handler.search_books,
+            self.db_handler.load_book_rows,
+            executor=self.db_executor,
+            parent=self,
+        )
+        self.book_model.loadFailed.connect(self.show_database_error)
+        self.db_handler.add_change_listener(self.change_notifier.notify)
+        self.change_notifier.changed.connect(self.book_model.apply_change)
+        self.book_proxy = BookFilterProxyModel(self.book_model, self)
+
+        self.book_table = QTableView()
+        self.book_table.setModel(self.book_proxy)
+        self.book_table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.book_table.setSelectionMode(QAbstractItemView.ExtendedSelection)
+        self.book_table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.book_table.setContextMenuPolicy(Qt.CustomContextMenu)
+        self.book_table.customContextMenuRequested.connect(self.show_book_context_menu)
+        self.book_table.doubleClicked.connect(
+            lambda index: self.show_edit_book_page(self.book_proxy.book_at(index.row()))
+        )
+
+        self.book_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.book_table.horizontalHeader().setStretchLastSection(True)
+        self.book_table.horizontalHeader().setSortIndicator(0, Qt.AscendingOrder)
+        self.book_table.setSortingEnabled(True)
+
+        vertical_header = self.book_table.verticalHeader()
+        vertical_header.setSectionResizeMode(QHeaderView.Fixed)
+        vertical_header.setDefaultSectionSize(50)
+
+        self.delete_selected_books_button = QPushButton("Delete Selected Books")
+        self.delete_selected_books_button.clicked.connect(
+            self.confirm_delete_selected_books
+        )
+        self.bulk_edit_button = QPushButton("Bulk Edit")
+        self.bulk_edit_button.clicked.connect(self.show_bulk_edit_dialog)
+        self.delete_all_book_button = QPushButton("Delete All Books")
+        self.delete_all_book_button.clicked.connect(self.confirm_delete_all_books)
+
+        batch_layout = QHBoxLayout()
+        batch_layout.addWidget(self.delete_selected_books_button)
+        batch_layout.addWidget(self.bulk_edit_button)
+        batch_layout.addWidget(self.delete_all_book_button)
+        self.batch_actions = self.create_widget(batch_layout)
+        self.batch_actions.layout().setContentsMargins(0, 0, 0, 0)
+
+        self.empty_message_label = QLabel(
+            "No books found. Click the button below to add a new book."
+        )
+        self.empty_message_label.setAlignment(Qt.AlignCenter)
+        self.empty_message_label.setStyleSheet("font-size: 24pt; color: #4a90e2;")
+
+        add_book_button = QPushButton("Add New Book")
+        add_book_button.clicked.connect(self.show_add_book_page)
+
+        add_random_book_button = QPushButton("Add Random Book")
+        add_random_book_button.clicked.connect(self.add_random_book)
+
+        statistics_button = QPushButton("Statistics")
+        statistics_button.clicked.connect(self.show_dashboard_page)
+
+        self.batch_edits_checkbox = QCheckBox("Batch edits")
+        self.batch_edits_checkbox.toggled.connect(self.on_batch_edits_toggled)
+        self.save_changes_button = QPushButton()
+        self.save_changes_button.clicked.connect(self.save_pending_changes)
+        save_layout = QHBoxLayout()
+        save_layout.addWidget(self.batch_edits_checkbox)
+        self.discard_changes_button = QPushButton("Discard")
+        self.discard_changes_button.clicked.connect(self.confirm_discard_changes)
+        save_layout.addWidget(self.save_changes_button, 1)
+        save_layout.addWidget(self.discard_changes_button)
+        self.update_save_button()
+
+        layout = QVBoxLayout()
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.addLayout(self.build_search_bar())
+        layout.addWidget(self.book_table, 1)
+        layout.addWidget(self.batch_actions)
+        layout.addWidget(self.empty_message_label, 1)
+        layout.addWidget(add_book_button)
+        layout.addWidget(add_random_book_button)
+        layout.addWidget(statistics_button)
+        layout.addLayout(save_layout)
+
+        self.book_proxy.modelReset.connect(self.update_main_page_state)
+        self.book_proxy.layoutChanged.connect(self.update_main_page_state)
+        self.book_proxy.rowsInserted.connect(self.update_main_page_state)
+        self.book_proxy.rowsRemoved.connect(self.update_main_page_state)
+        self.book_model.pageLoaded.connect(self.update_main_page_state)
+        self.book_table.selectionModel().selectionChanged.connect(
+            self.update_main_page_state
+        )
+
+        self.book_model.fetchMore()
+        self.update_main_page_state()
+
+        return self.create_widget(layout)
+
+    def writer(self):
+        if self.batch_edits_checkbox.isChecked():
+            return self.write_batcher
+        return self.db_handler
+
+    def after_pending_writes(self, fn):
+        # Set-based operations must see queued edits, so they run after a
+        # flush in the same worker task.
+        @wraps(fn)
+        def run(*args, **kwargs):
+            self.write_batcher.flush()
+            return fn(*args, **kwargs)
+
+        return run
+
+    def on_batch_edits_toggled(self, checked):
+        if not checked:
+            self.save_pending_changes()
+
+    def schedule_write_flush(self):
+        self.update_save_button()
+        if not self.write_batcher:
+            return
+        if self.write_batcher.is_full():
+            self.save_pending_changes()
+        elif len(self.write_batcher) and not self.write_flush_timer.isActive():
+            self.write_flush_timer.start()
+
+    def save_pending_changes(self):
+        self.write_flush_timer.stop()
+        if not self.write_batcher or not len(self.write_batcher):
+            return
+
+        # Flushes are not keyed: superseding a running flush would hide its
+        # error, and the batcher already serialises them.
+        self.db_executor.submit(
+            self.write_batcher.flush,
+            on_result=lambda _: self.update_save_button(),
+            on_error=self.on_save_failed,
+        )
+
+    def on_save_failed(self, error):
+        self.update_save_button()
+        self.show_database_error(error)
+
+    def update_save_button(self):
+        pending = len(self.write_batcher) if self.write_batcher else 0
+        self.save_changes_button.setText(f"Save Changes ({pending})")
+        self.save_changes_button.setEnabled(pending > 0)
+        self.discard_changes_button.setEnabled(pending > 0)
+
+    def confirm_discard_changes(self):
+        if not (pending := len(self.write_batcher)):
+            return
+
+        confirmation = QMessageBox.question(
+            self,
+            "Confirmation",
+            f"Do you want to discard {pending} unsaved changes?",
+            QMessageBox.Yes | QMessageBox.No,
+            QMessageBox.No,
+        )
+
+        if confirmation == QMessageBox.Yes:
+            self.write_flush_timer.stop()
+            self.write_batcher.discard()
+            self.update_save_button()
+
+    def update_main_page_state(self):
+        has_books = self.book_proxy.rowCount() > 0
+        self.book_table.setVisible(has_books)
+        self.batch_actions.setVisible(has_books)
+        has_selection = self.book_table.selectionModel().hasSelection()
+        self.delete_selected_books_button.setEnabled(has_selection)
+        self.bulk_edit_button.setEnabled(has_selection)
+        self.empty_message_label.setVisible(not has_books)
+        if self.book_model.is_fetching():
+            self.empty_message_label.setText("Loading books...")
+        elif self.book_model.query.has_filters() or self.book_proxy.is_filtered():
+            self.empty_message_label.setText("No books match the search.")
+        else:
+            self.empty_message_label.setText(
+                "No books found. Click the button below to add a new book."
             )
 
-            for row, book in enumerate(books):
-                table.setItem(row, 0, QTableWidgetItem(book.ISBN))
-                table.setItem(row, 1, QTableWidgetItem(book.title))
-                table.setItem(row, 2, QTableWidgetItem(book.author))
-                table.setItem(row, 3, QTableWidgetItem(str(book.year_published)))
-                table.setItem(row, 4, QTableWidgetItem(self.format_idr(book.price)))
+    def build_search_bar(self):
+        self.search_input = self.create_line_edit("Search title or author")
+        self.year_min_input = self.create_line_edit("Year from")
+        self.year_max_input = self.create_line_edit("Year to")
+        self.price_min_input = self.create_line_edit("Min price")
+        self.price_max_input = self.create_line_edit("Max price")
+        self.full_text_checkbox = QCheckBox("Full-text")
+        self.quick_filter_input = self.create_line_edit("Filter loaded books")
+        self.quick_filter_input.textChanged.connect(self.filter_timer.start)
+
+        for line_edit in (
+            self.search_input,
+            self.year_min_input,
+            self.year_max_input,
+            self.price_min_input,
+            self.price_max_input,
+        ):
+            line_edit.returnPressed.connect(self.search_books)
+
+        search_button = self.create_button("Search", self.search_books)
+        clear_button = self.create_button("Clear", self.clear_search)
+
+        layout = QHBoxLayout()
+        layout.addWidget(self.search_input, 3)
+        layout.addWidget(self.year_min_input, 1)
+        layout.addWidget(self.year_max_input, 1)
+        layout.addWidget(self.price_min_input, 1)
+        layout.addWidget(self.price_max_input, 1)
+        layout.addWidget(self.full_text_checkbox)
+        layout.addWidget(self.quick_filter_input, 2)
+        layout.addWidget(search_button)
+        layout.addWidget(clear_button)
+        return layout
+
+    @timed("ui.search_books")
+    def search_books(self):
+        from .search import BookQuery
 
-                edit_button = self.create_button(
-                    "Edit", lambda _, b=book: self.show_edit_book_page(b)
-                )
-                delete_button = self.create_button(
-                    "Delete", lambda _, b=book: self.confirm_delete_book(b)
+        try:
+            bounds = [
+                int(line_edit.text()) if line_edit.text() else None
+                for line_edit in (
+                    self.year_min_input,
+                    self.year_max_input,
+                    self.price_min_input,
+                    self.price_max_input,
                 )
+            ]
+        except ValueError:
+            self.show_error_dialog("Year and price filters must be numbers.")
+            return
+
+        year_min, year_max, price_min, price_max = bounds
+        current = self.book_model.query
+        self.book_model.set_query(
+            BookQuery(
+                text=self.search_input.text().strip(),
+                year_min=year_min,
+                year_max=year_max,
+                price_min=price_min,
+                price_max=price_max,
+                sort_by=current.sort_by,
+                descending=current.descending,
+                full_text=self.full_text_checkbox.isChecked(),
+            )
+        )
+
+    def apply_quick_filter(self):
+        self.book_proxy.set_filter_text(self.quick_filter_input.text())
+
+    def clear_search(self):
+        for line_edit in (
+            self.quick_filter_input,
+            self.search_input,
+            self.year_min_input,
+            self.year_max_input,
+            self.price_min_input,
+            self.price_max_input,
+        ):
+            line_edit.clear()
+        self.full_text_checkbox.setChecked(False)
+        self.search_books()
+
+    def show_book_context_menu(self, pos):
+        table = self.book_table
+        index = table.indexAt(pos)
+        if not index.isValid():
+            return
+
+        book = self.book_proxy.book_at(index.row())
+        selected_count = len(table.selectionModel().selectedRows())
+
+        menu = QMenu(table)
+        if selected_count > 1 and table.selectionModel().isRowSelected(
+            index.row(), index.parent()
+        ):
+            delete_action = menu.addAction(f"Delete {selected_count} Selected Books")
+            edit_action = menu.addAction(f"Bulk Edit {selected_count} Selected Books")
+            action = menu.exec_(table.viewport().mapToGlobal(pos))
+            if action == edit_action:
+                self.show_bulk_edit_dialog()
+            elif action == delete_action:
+                self.confirm_delete_selected_books()
+            return
+
+        edit_action = menu.addAction("Edit")
+        delete_action = menu.addAction("Delete")
+
+        action = menu.exec_(table.viewport().mapToGlobal(pos))
+        if action == edit_action:
+            self.show_edit_book_page(book)
+        elif action == delete_action:
+            self.confirm_delete_book(book)
+
+    def selected_isbns(self):
+        return [
+            self.book_proxy.book_at(index.row()).ISBN
+            for index in self.book_table.selectionModel().selectedRows()
+        ]
+
+    def visible_isbns(self):
+        return [
+            self.book_proxy.book_at(row).ISBN
+            for row in range(self.book_proxy.rowCount())
+        ]
+
+    @timed("ui.show_dashboard_page")
+    def show_dashboard_page(self):
+        self.clear_layout()
 
-                layout = QHBoxLayout()
-                layout.addWidget(edit_button)
-                layout.addWidget(delete_button)
+        if self.dashboard_page is None:
+            self.dashboard_page = self.build_dashboard_page()
+            self.change_notifier.changed.connect(self.refresh_dashboard)
 
-                widget = self.create_widget(layout)
-                table.setCellWidget(row, 5, widget)
+        self.main_layout.addWidget(self.dashboard_page, 1)
+        self.dashboard_page.show()
+        self.load_dashboard()
 
-            scroll_area = self.create_scroll_area(table)
+    def build_dashboard_page(self):
+        dashboard_label = QLabel("Catalogue Statistics")
+        dashboard_label.setStyleSheet("font-size: 24pt; color: #4a90e2;")
+        dashboard_label.setAlignment(Qt.AlignCenter)
 
-            self.main_layout.addWidget(scroll_area, 1)
+        self.stats_labels = {
+            name: QLabel()
+            for name in ("count", "authors", "years", "price_range", "price_avg")
+        }
+        self.stats_labels["percentiles"] = QLabel()
 
-            table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
-            table.horizontalHeader().setStretchLastSection(True)
+        summary_layout = QFormLayout()
+        summary_layout.addRow("Books:", self.stats_labels["count"])
+        summary_layout.addRow("Authors:", self.stats_labels["authors"])
+        summary_layout.addRow("Published:", self.stats_labels["years"])
+        summary_layout.addRow("Price range:", self.stats_labels["price_range"])
+        summary_layout.addRow("Average price:", self.stats_labels["price_avg"])
+        summary_layout.addRow("Price percentiles:", self.stats_labels["percentiles"])
 
-            vertical_header = table.verticalHeader()
-            vertical_header.setDefaultSectionSize(100)
+        self.author_stats_table = self.create_stats_table(["Top Authors", "Books"])
+        self.year_stats_table = self.create_stats_table(["Decade", "Books", "Share"])
 
-            delete_all_book_button = QPushButton("Delete All Books")
-            delete_all_book_button.clicked.connect(self.confirm_delete_all_books)
-            self.main_layout.addWidget(delete_all_book_button)
+        tables_layout = QHBoxLayout()
+        tables_layout.addWidget(self.author_stats_table)
+        tables_layout.addWidget(self.year_stats_table)
+
+        refresh_button = QPushButton("Refresh")
+        refresh_button.clicked.connect(lambda: self.load_dashboard(use_cache=False))
+
+        back_button = QPushButton("Back")
+        back_button.clicked.connect(self.show_main_page)
+
+        back_refresh_layout = QHBoxLayout()
+        back_refresh_layout.addWidget(back_button)
+        back_refresh_layout.addWidget(refresh_button)
+
+        layout = QVBoxLayout()
+        layout.addWidget(dashboard_label)
+        layout.addLayout(summary_layout)
+        layout.addLayout(tables_layout, 1)
+        layout.addLayout(back_refresh_layout)
+
+        return self.create_widget(layout)
+
+    def create_stats_table(self, headers):
+        table = QTableWidget(0, len(headers))
+        table.setHorizontalHeaderLabels(headers)
+        table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+        table.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
+        table.verticalHeader().setVisible(False)
+        return table
+
+    def load_dashboard(self, use_cache=True):
+        self.db_executor.submit(
+            self.db_handler.catalogue_stats,
+            use_cache=use_cache,
+            on_result=self.fill_dashboard,
+            on_error=self.show_database_error,
+            key="catalogue_stats",
+        )
+
+    def refresh_dashboard(self, kind, isbns):
+        # Writes invalidate the cached statistics; only recompute while visible.
+        if self.dashboard_page.isVisible():
+            self.load_dashboard()
+
+    def fill_dashboard(self, stats):
+        price, year = stats["price"], stats["year"]
+        self.stats_labels["count"].setText(f"{stats['count']:,}")
+        self.stats_labels["authors"].setText(f"{stats['authors']:,}")
+        if not stats["count"]:
+            for name in ("years", "price_range", "price_avg", "percentiles"):
+                self.stats_labels[name].setText("-")
         else:
-            message_label = QLabel(
-                "No books found. Click the button below to add a new book."
+            self.stats_labels["years"].setText(f"{year['min']} - {year['max']}")
+            self.stats_labels["price_range"].setText(
+                f"{format_idr(price['min'])} - {format_idr(price['max'])}"
+            )
+            self.stats_labels["price_avg"].setText(format_idr(price["avg"]))
+            self.stats_labels["percentiles"].setText(
+                ", ".join(
+                    f"P{percentile} {format_idr(value)}"
+                    for percentile, value in price["percentiles"].items()
+                )
             )
-            message_label.setAlignment(Qt.AlignCenter)
-            message_label.setStyleSheet("font-size: 24pt; color: #4a90e2;")
-            self.main_layout.addWidget(message_label)
 
-        add_book_button = QPushButton("Add New Book")
-        add_book_button.clicked.connect(self.show_add_book_page)
+        self.fill_stats_table(
+            self.author_stats_table,
+            [(author, f"{books:,}") for author, books in stats["top_authors"]],
+        )
+        self.fill_stats_table(
+            self.year_stats_table,
+            [
+                (f"{decade}s", f"{books:,}", f"{books / stats['count']:.1%}")
+                for decade, books in stats["years"]
+            ],
+        )
 
-        add_random_book_button = QPushButton("Add Random Book")
-        add_random_book_button.clicked.connect(self.add_random_book)
-        self.main_layout.addWidget(add_book_button)
-        self.main_layout.addWidget(add_random_book_button)
+    def fill_stats_table(self, table, rows):
+        table.setRowCount(len(rows))
+        for row, values in enumerate(rows):
+            for column, value in enumerate(values):
+                table.setItem(row, column, QTableWidgetItem(value))
 
+    @timed("ui.show_add_book_page")
     def show_add_book_page(self):
         self.clear_layout()
 
@@ -227,6 +661,7 @@ class BookManagementSystem(QMainWindow):
         widget = self.create_widget(layout)
         self.main_layout.addWidget(widget)
 
+    @timed("ui.show_edit_book_page")
     def show_edit_book_page(self, book):
         self.clear_layout()
 
@@ -268,6 +703,7 @@ class BookManagementSystem(QMainWindow):
         widget = self.create_widget(layout)
         self.main_layout.addWidget(widget)
 
+    @timed("ui.add_book")
     def add_book(self):
         isbn = self.isbn_input.text()
         title = self.title_input.text()
@@ -275,41 +711,63 @@ class BookManagementSystem(QMainWindow):
         year = self.year_input.text()
         price = self.price_input.text()
 
-        if not isbn or not title or not author or not year or not price:
-            self.show_error_dialog("All fields must be filled.")
-            return
-
         try:
-            year = int(year)
-            price = int(price)
-            if year < 1900 or year > 2024:
-                raise ValueError("Year must be between 1900 and 2024.")
-            if price <= 0 or price > 1000000:
-                raise ValueError("Price must be greater than 0 and less than 1000000.")
+            isbn, title, author, year, price = validate_book(
+                isbn, title, author, year, price
+            )
         except ValueError as e:
             self.show_error_dialog(str(e))
             return
 
-        if self.db_handler.is_isbn_duplicate(isbn):
+        self.db_executor.submit(
+            self.writer().insert_new_book,
+            isbn,
+            title,
+            author,
+            year,
+            price,
+            on_result=self.on_book_added,
+            on_error=self.show_database_error,
+        )
+
+    def on_book_added(self, added):
+        if not added:
             self.show_error_dialog("ISBN already exists.")
             return
 
-        self.db_handler.insert_book(isbn, title, author, year, price)
+        self.schedule_write_flush()
         self.show_success_dialog("Book added successfully.")
         self.show_main_page()
 
     def add_random_book(self):
-        self.db_handler.generate_fake_data(1)
-        self.show_success_dialog("Book added successfully.")
-        self.show_main_page()
+        self.db_executor.submit(
+            self.db_handler.generate_fake_data,
+            1,
+            on_result=lambda _: self.show_success_dialog("Book added successfully."),
+            on_error=self.show_database_error,
+        )
 
+    @timed("ui.edit_book")
     def edit_book(self, isbn):
         title = self.title_input.text()
         author = self.author_input.text()
         year = self.year_input.text()
         price = self.price_input.text()
 
-        if current_book := self.db_handler.load_book_by_isbn(isbn):
+        self.db_executor.submit(
+            self.writer().load_book_by_isbn,
+            isbn,
+            on_result=lambda current_book: self.apply_book_edit(
+                current_book, title, author, year, price
+            ),
+            on_error=self.show_database_error,
+            key=("edit", isbn),
+        )
+
+    @timed("ui.apply_book_edit")
+    def apply_book_edit(self, current_book, title, author, year, price):
+        if current_book:
+            isbn = current_book.ISBN
             if (
                 title == current_book.title
                 and author == current_book.author
@@ -321,23 +779,28 @@ class BookManagementSystem(QMainWindow):
                 return
 
             try:
-                year = int(year)
-                price = int(price)
-                if year < 1900 or year > 2024:
-                    raise ValueError("Year must be between 1900 and 2024.")
-                if price <= 0:
-                    raise ValueError("Price must be greater than 0.")
+                isbn, title, author, year, price = validate_book(
+                    isbn, title, author, year, price
+                )
             except ValueError as e:
                 self.show_error_dialog(str(e))
                 return
 
-            if not title or not author:
-                self.show_error_dialog("Title and Author fields must be filled.")
-                return
+            self.db_executor.submit(
+                self.writer().update_book,
+                isbn,
+                title,
+                author,
+                year,
+                price,
+                on_result=self.on_book_updated,
+                on_error=self.show_database_error,
+            )
 
-            self.db_handler.update_book(isbn, title, author, year, price)
-            self.show_success_dialog("Book updated successfully.")
-            self.show_main_page()
+    def on_book_updated(self, _):
+        self.schedule_write_flush()
+        self.show_success_dialog("Book updated successfully.")
+        self.show_main_page()
 
     def confirm_delete_book(self, book):
         confirmation = QMessageBox.question(
@@ -349,9 +812,71 @@ class BookManagementSystem(QMainWindow):
         )
 
         if confirmation == QMessageBox.Yes:
-            self.db_handler.delete_book(book.ISBN)
-            self.show_success_dialog("Book deleted successfully.")
-            self.show_main_page()
+            self.db_executor.submit(
+                self.writer().delete_book,
+                book.ISBN,
+                on_result=lambda _: self.on_books_deleted("Book deleted successfully."),
+                on_error=self.show_database_error,
+            )
+
+    def confirm_delete_selected_books(self):
+        if not (isbns := self.selected_isbns()):
+            return
+
+        confirmation = QMessageBox.question(
+            self,
+            "Confirmation",
+            f"Do you want to delete {len(isbns)} selected books?",
+            QMessageBox.Yes | QMessageBox.No,
+            QMessageBox.No,
+        )
+
+        if confirmation == QMessageBox.Yes:
+            self.db_executor.submit(
+                self.writer().delete_books,
+                isbns,
+                on_result=lambda count: self.on_books_deleted(
+                    f"{count} books deleted successfully."
+                ),
+                on_error=self.show_database_error,
+            )
+
+    def on_books_deleted(self, message):
+        self.schedule_write_flush()
+        self.show_success_dialog(message)
+
+    def show_bulk_edit_dialog(self):
+        isbns = self.selected_isbns()
+        # The quick filter only narrows the loaded rows, so a filtered table
+        # edits exactly the visible books rather than the whole search.
+        if filtered := self.book_proxy.is_filtered():
+            matching = self.visible_isbns()
+            matching_count = len(matching)
+        else:
+            matching = None
+            complete = self.book_model.is_complete()
+            matching_count = self.book_model.rowCount() if complete else None
+
+        dialog = BulkEditDialog(len(isbns), matching_count, filtered, self)
+        if dialog.exec_() != QDialog.Accepted:
+            return
+
+        query = None
+        if not dialog.selected_only:
+            isbns = matching
+            query = None if filtered else self.book_model.query
+
+        self.db_executor.submit(
+            self.after_pending_writes(self.db_handler.bulk_update),
+            isbns,
+            query,
+            price_percent=dialog.price_percent,
+            year=dialog.year,
+            on_result=lambda count: self.show_success_dialog(
+                f"{count} books updated successfully."
+            ),
+            on_error=self.show_database_error,
+        )
 
     def confirm_delete_all_books(self):
         confirmation = QMessageBox.question(
@@ -363,9 +888,32 @@ class BookManagementSystem(QMainWindow):
         )
 
         if confirmation == QMessageBox.Yes:
-            self.db_handler.delete_all_books()
-            self.show_success_dialog("All Books deleted successfully.")
-            self.show_main_page()
+            from .models import now_ms
+
+            since = now_ms()
+            self.db_executor.submit(
+                self.after_pending_writes(self.db_handler.delete_all_books),
+                on_result=lambda _: self.offer_restore_all_books(since),
+                on_error=self.show_database_error,
+            )
+
+    def offer_restore_all_books(self, since):
+        answer = QMessageBox.question(
+            self,
+            "Success",
+            "All Books deleted successfully. Do you want to undo this?",
+            QMessageBox.Yes | QMessageBox.No,
+            QMessageBox.No,
+        )
+        if answer == QMessageBox.Yes:
+            self.db_executor.submit(
+                self.db_handler.restore_deleted_books,
+                since,
+                on_result=lambda count: self.show_success_dialog(
+                    f"{count} books restored successfully."
+                ),
+                on_error=self.show_database_error,
+            )
 
     def show_success_dialog(self, message):
         QMessageBox.information(self, "Success", message, QMessageBox.Ok)
@@ -376,16 +924,77 @@ class BookManagementSystem(QMainWindow):
     def show_info_dialog(self, message):
         QMessageBox.information(self, "Information", message, QMessageBox.Ok)
 
-    def format_idr(self, value):
-        try:
-            num_value = float(value)
-            return "Rp {:,.0f}".format(num_value).replace(",", ".")
-        except ValueError:
-            return "Invalid Value"
+    def show_database_error(self, error):
+        self.check_connection()
+        self.show_error_dialog(f"Database error: {error}")
 
     def setup_database_connection(self):
         if self.db_connection_handler.setup_database_connection(self):
             self.db_handler = self.db_connection_handler.db_handler
+            self.connection_status_label = QLabel()
+            self.statusBar().addPermanentWidget(self.connection_status_label)
             self.show_main_page()
+            self.check_connection()
         else:
             self.close()
+
+    def check_connection(self):
+        if not getattr(self, "db_handler", None):
+            return
+
+        self.health_timer.stop()
+        self.db_executor.submit(
+            self.db_handler.ping,
+            on_result=self.on_connection_ok,
+            on_error=self.on_connection_failed,
+            key="health_check",
+        )
+
+    def on_connection_ok(self, latency):
+        self.connection_status_label.setText(f"Database: connected ({latency:.0f} ms)")
+        self.connection_status_label.setToolTip("")
+        if not self.database_online:
+            self.database_online = True
+            # Reload pages and resend edits that failed while the server was away.
+            if self.main_page is not None:
+                self.book_model.reload()
+                self.schedule_write_flush()
+        self.health_timer.start(HEALTH_CHECK_INTERVAL_MS)
+
+    def on_connection_failed(self, error):
+        self.database_online = False
+        if hasattr(self.db_handler, "sync_status"):
+            self.connection_status_label.setText(
+                "Database: offline, changes are kept locally"
+            )
+        else:
+            self.connection_status_label.setText(
+                "Database: unreachable, reconnecting..."
+            )
+        self.connection_status_label.setToolTip(str(error))
+        self.health_timer.start(HEALTH_CHECK_RETRY_MS)
+
+    def show_diagnostics(self):
+        if self.diagnostics_dialog is None:
+            self.diagnostics_dialog = DiagnosticsDialog(
+                metrics, lambda: getattr(self, "db_handler", None), self
+            )
+        self.diagnostics_dialog.refresh()
+        self.diagnostics_dialog.show()
+        self.diagnostics_dialog.raise_()
+
+    def closeEvent(self, event):
+        self.health_timer.stop()
+        self.db_executor.cancel_keyed()
+        self.db_executor.wait_for_done()
+        self.db_connection_handler.discard_prewarmed()
+        if self.write_batcher and len(self.write_batcher):
+            try:
+                self.write_batcher.flush()
+            except Exception as error:
+                self.show_database_error(error)
+        if db_handler := getattr(self, "db_handler", None):
+            db_handler.dispose()
+        if metrics_file := os.getenv("PYQTLMS_METRICS_FILE"):
+            metrics.dump(metrics_file)
+        super().closeEvent(event)
@@ -0,0 +1,79 @@
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import URL, make_url
+from sqlalchemy.pool import QueuePool
+
+MEMORY_URL = "sqlite://"
+
+# Tuned for a single-user desktop catalogue: WAL lets the background workers
+# read while a write is in progress, and NORMAL sync is durable under WAL.
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "temp_store": "MEMORY",
+    "cache_size": -65536,
+    "mmap_size": 268435456,
+    "busy_timeout": 5000,
+    "foreign_keys": "ON",
+}
+
+
+def mysql_url(host, user, password, database):
+    host, _, port = host.partition(":")
+    return URL.create(
+        "mysql+mysqlconnector",
+        username=user,
+        password=password,
+        host=host,
+        port=int(port) if port else None,
+        database=database,
+    )
+
+
+def is_memory_url(url):
+    url = make_url(url)
+    return url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:")
+
+
+def create_backend_engine(
+    url, pool_size, max_overflow, pool_pre_ping, pool_recycle, pool_timeout
+):
+    url = make_url(url)
+    if url.get_backend_name() == "sqlite":
+        return create_sqlite_engine(url)
+
+    return create_engine(
+        url,
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_pre_ping=pool_pre_ping,
+        pool_recycle=pool_recycle,
+        pool_timeout=pool_timeout,
+    )
+
+
+def create_sqlite_engine(url):
+    pragmas = dict(SQLITE_PRAGMAS)
+    if is_memory_url(url):
+        # Every connection to ":memory:" is a separate database, so all
+        # sessions share one connection. A pool of exactly one hands it to one
+        # thread at a time; pysqlite connections are not safe to use
+        # concurrently.
+        engine = create_engine(
+            MEMORY_URL,
+            poolclass=QueuePool,
+            pool_size=1,
+            max_overflow=0,
+            connect_args={"check_same_thread": False},
+        )
+        del pragmas["journal_mode"], pragmas["mmap_size"]
+    else:
+        engine = create_engine(url, connect_args={"check_same_thread": False})
+
+    @event.listens_for(engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+    return engine
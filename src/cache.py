@@ -0,0 +1,57 @@
+from threading import Lock
+from collections import OrderedDict
+
+MISSING = object()
+
+
+class LRUCache:
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._version = 0
+        self._lock = Lock()
+
+    @property
+    def version(self):
+        return self._version
+
+    def get(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+            return MISSING
+
+    def put(self, key, value, version=None):
+        with self._lock:
+            # A write since the caller read `version` may have made value stale.
+            if self.maxsize <= 0 or (version is not None and version != self._version):
+                return
+
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key):
+        with self._lock:
+            self._version += 1
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._version += 1
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+            }
@@ -0,0 +1,430 @@
+import os
+import sys
+import time
+import argparse
+from datetime import datetime
+from .config import DATABASE_NAME, connection_url, load_connection_settings
+from .database import (
+    DatabaseHandler,
+    PAGE_SIZE,
+    SEED_BATCH_SIZE,
+    HISTORY_PAGE_SIZE,
+    TOP_AUTHORS,
+    YEAR_BUCKET,
+)
+from .search import BookQuery, SORT_COLUMNS
+from .transfer import import_books, export_books, IMPORT_CHUNK_SIZE, EXPORT_BATCH_SIZE
+from .migrations import MigrationError, LATEST_VERSION
+from .replica import ReplicaDatabaseHandler
+from .utils import validate_book
+from .instrumentation import metrics
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="python -m src.cli", description="PyQtLMS command line tools"
+    )
+    parser.add_argument(
+        "--url",
+        default=os.getenv("PYQTLMS_URL"),
+        help="SQLAlchemy database URL, e.g. sqlite:///books.db",
+    )
+    parser.add_argument("--host", default=os.getenv("PYQTLMS_HOST"))
+    parser.add_argument("--user", default=os.getenv("PYQTLMS_USER"))
+    parser.add_argument("--password", default=os.getenv("PYQTLMS_PASSWORD"))
+    parser.add_argument(
+        "--database", default=os.getenv("PYQTLMS_DATABASE", DATABASE_NAME)
+    )
+
+    parser.add_argument(
+        "--metrics-out", help="Write query and timing metrics to this JSON file"
+    )
+
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    list_parser = subparsers.add_parser("list", help="List books")
+    list_parser.add_argument("--search")
+    list_parser.add_argument("--sort", choices=list(SORT_COLUMNS), default="isbn")
+    list_parser.add_argument("--desc", action="store_true")
+    list_parser.add_argument("--limit", type=int, default=50)
+    list_parser.add_argument(
+        "--all", action="store_true", help="Stream every book, ignoring --limit"
+    )
+    list_parser.set_defaults(handler=list_books)
+
+    get_parser = subparsers.add_parser("get", help="Show a book by ISBN")
+    get_parser.add_argument("isbn")
+    get_parser.set_defaults(handler=get_book)
+
+    add_parser = subparsers.add_parser("add", help="Add a book")
+    add_parser.add_argument("isbn")
+    add_parser.add_argument("title")
+    add_parser.add_argument("author")
+    add_parser.add_argument("year")
+    add_parser.add_argument("price")
+    add_parser.set_defaults(handler=add_book)
+
+    update_parser = subparsers.add_parser("update", help="Update a book")
+    update_parser.add_argument("isbn")
+    update_parser.add_argument("--title")
+    update_parser.add_argument("--author")
+    update_parser.add_argument("--year")
+    update_parser.add_argument("--price")
+    update_parser.set_defaults(handler=update_book)
+
+    delete_parser = subparsers.add_parser("delete", help="Delete books by ISBN")
+    delete_parser.add_argument("isbns", nargs="+")
+    delete_parser.set_defaults(handler=delete_books)
+
+    stats_parser = subparsers.add_parser("stats", help="Show catalogue statistics")
+    stats_parser.add_argument("--top-authors", type=int, default=TOP_AUTHORS)
+    stats_parser.add_argument("--year-bucket", type=positive_int, default=YEAR_BUCKET)
+    stats_parser.set_defaults(handler=show_stats)
+
+    history_parser = subparsers.add_parser("history", help="Show the change history")
+    history_parser.add_argument("--isbn")
+    history_parser.add_argument(
+        "--since", type=parse_time, help="ISO date/time or epoch milliseconds"
+    )
+    history_parser.add_argument("--until", type=parse_time)
+    history_parser.add_argument("--limit", type=int, default=HISTORY_PAGE_SIZE)
+    history_parser.set_defaults(handler=show_history)
+
+    restore_parser = subparsers.add_parser(
+        "restore", help="Undo a history entry or the deletions in a time range"
+    )
+    restore_target = restore_parser.add_mutually_exclusive_group(required=True)
+    restore_target.add_argument("--entry", type=int, help="History entry id")
+    restore_target.add_argument(
+        "--since", type=parse_time, help="ISO date/time or epoch milliseconds"
+    )
+    restore_parser.add_argument("--until", type=parse_time)
+    restore_parser.set_defaults(handler=restore)
+
+    seed_parser = subparsers.add_parser("seed", help="Insert random books in bulk")
+    seed_parser.add_argument("count", type=int)
+    seed_parser.add_argument("--batch-size", type=int, default=SEED_BATCH_SIZE)
+    seed_parser.set_defaults(handler=seed)
+
+    import_parser = subparsers.add_parser(
+        "import", help="Upsert books from a CSV or JSON Lines file"
+    )
+    import_parser.add_argument("path")
+    import_parser.add_argument("--format", choices=["csv", "jsonl"])
+    import_parser.add_argument("--chunk-size", type=int, default=IMPORT_CHUNK_SIZE)
+    import_parser.set_defaults(handler=import_file)
+
+    export_parser = subparsers.add_parser(
+        "export", help="Write all books to a CSV or JSON Lines file"
+    )
+    export_parser.add_argument("path")
+    export_parser.add_argument("--format", choices=["csv", "jsonl"])
+    export_parser.add_argument("--batch-size", type=int, default=EXPORT_BATCH_SIZE)
+    export_parser.set_defaults(handler=export_file)
+
+    migrate_parser = subparsers.add_parser(
+        "migrate", help="Apply pending schema migrations"
+    )
+    migrate_parser.add_argument(
+        "--status",
+        action="store_true",
+        help="List pending migrations without applying them",
+    )
+    migrate_parser.set_defaults(handler=migrate_schema, auto_migrate=False)
+
+    sync_parser = subparsers.add_parser(
+        "sync", help="Synchronise a local SQLite replica with the database"
+    )
+    sync_parser.add_argument("replica", help="Path of the local SQLite file")
+    sync_parser.set_defaults(handler=sync_replica)
+
+    return parser
+
+
+def print_book(book):
+    print(
+        "\t".join(
+            str(value)
+            for value in (
+                book.ISBN,
+                book.title,
+                book.author,
+                book.year_published,
+                book.price,
+            )
+        )
+    )
+
+
+def list_books(db_handler, args):
+    if args.all and not args.search and args.sort == "isbn" and not args.desc:
+        for book in db_handler.stream_book_rows():
+            print_book(book)
+        return 0
+
+    query = BookQuery(text=args.search, sort_by=args.sort, descending=args.desc)
+    printed = 0
+    last_book = None
+    while args.all or printed < args.limit:
+        limit = PAGE_SIZE if args.all else min(PAGE_SIZE, args.limit - printed)
+        books = db_handler.search_books(query, last_book, limit)
+        for book in books:
+            print_book(book)
+
+        printed += len(books)
+        if len(books) < limit:
+            break
+        last_book = books[-1]
+    return 0
+
+
+def get_book(db_handler, args):
+    if not (book := db_handler.load_book_by_isbn(args.isbn)):
+        print(f"No book with ISBN {args.isbn}.", file=sys.stderr)
+        return 1
+
+    print_book(book)
+    return 0
+
+
+def add_book(db_handler, args):
+    try:
+        isbn, title, author, year, price = validate_book(
+            args.isbn, args.title, args.author, args.year, args.price
+        )
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 1
+
+    if not db_handler.insert_new_book(isbn, title, author, year, price):
+        print("ISBN already exists.", file=sys.stderr)
+        return 1
+    return 0
+
+
+def update_book(db_handler, args):
+    if not (book := db_handler.load_book_by_isbn(args.isbn)):
+        print(f"No book with ISBN {args.isbn}.", file=sys.stderr)
+        return 1
+
+    try:
+        isbn, title, author, year, price = validate_book(
+            book.ISBN,
+            args.title or book.title,
+            args.author or book.author,
+            args.year or book.year_published,
+            args.price or book.price,
+        )
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 1
+
+    db_handler.update_book(isbn, title, author, year, price)
+    return 0
+
+
+def delete_books(db_handler, args):
+    isbns = list(dict.fromkeys(args.isbns))
+    deleted = db_handler.delete_books(isbns)
+    if missing := len(isbns) - deleted:
+        print(f"{missing} of the given ISBNs were not found.", file=sys.stderr)
+        return 1
+    return 0
+
+
+def show_stats(db_handler, args):
+    stats = db_handler.catalogue_stats(args.top_authors, args.year_bucket)
+    price = stats["price"]
+    print(f"Books\t{stats['count']}")
+    print(f"Authors\t{stats['authors']}")
+    if not stats["count"]:
+        return 0
+
+    print(f"Years\t{stats['year']['min']}-{stats['year']['max']}")
+    print(f"Price\tmin {price['min']}\tmax {price['max']}\tavg {price['avg']:.0f}")
+    for percentile, value in price["percentiles"].items():
+        print(f"Price P{percentile}\t{value}")
+    for author, books in stats["top_authors"]:
+        print(f"Author\t{author}\t{books}")
+    for start, books in stats["years"]:
+        print(f"Years from {start}\t{books}")
+    return 0
+
+
+def positive_int(value):
+    if (number := int(value)) <= 0:
+        raise argparse.ArgumentTypeError(f"must be greater than 0, got {value}")
+    return number
+
+
+def parse_time(value):
+    if value.isdigit():
+        return int(value)
+    return int(datetime.fromisoformat(value).timestamp() * 1000)
+
+
+def format_time(milliseconds):
+    return datetime.fromtimestamp(milliseconds / 1000).isoformat(timespec="seconds")
+
+
+def show_history(db_handler, args):
+    for entry in db_handler.load_history(
+        args.isbn, args.since, args.until, limit=args.limit
+    ):
+        print(
+            "\t".join(
+                "" if value is None else str(value)
+                for value in (
+                    entry.id,
+                    format_time(entry.changed_at),
+                    entry.action,
+                    entry.ISBN,
+                    entry.old_title,
+                    entry.old_author,
+                    entry.old_year_published,
+                    entry.old_price,
+                    entry.new_title,
+                    entry.new_author,
+                    entry.new_year_published,
+                    entry.new_price,
+                )
+            )
+        )
+    return 0
+
+
+def restore(db_handler, args):
+    if args.entry is not None:
+        try:
+            action = db_handler.restore_change(args.entry)
+        except ValueError as e:
+            print(e, file=sys.stderr)
+            return 1
+        print(f"Restore applied as {action}.")
+        return 0
+
+    restored = db_handler.restore_deleted_books(args.since, args.until)
+    print(f"Restored {restored} deleted books.")
+    return 0
+
+
+def seed(db_handler, args):
+    start = time.perf_counter()
+    inserted = db_handler.seed_fake_data(args.count, batch_size=args.batch_size)
+    elapsed = time.perf_counter() - start
+    rate = inserted / elapsed if elapsed else 0
+    print(f"Inserted {inserted} books in {elapsed:.2f}s ({rate:,.0f} rows/s)")
+    return 0
+
+
+def report_progress(stats):
+    print(f"... {stats.rows} rows ({stats.rate:,.0f} rows/s)", file=sys.stderr)
+
+
+def import_file(db_handler, args):
+    stats = import_books(
+        db_handler,
+        args.path,
+        file_format=args.format,
+        chunk_size=args.chunk_size,
+        progress=report_progress,
+    )
+    for line_number, error in stats.errors:
+        print(f"Line {line_number}: {error}", file=sys.stderr)
+    print(f"Imported {stats}, rejected {stats.rejected}")
+    return 1 if stats.rejected else 0
+
+
+def export_file(db_handler, args):
+    stats = export_books(
+        db_handler,
+        args.path,
+        file_format=args.format,
+        batch_size=args.batch_size,
+        progress=report_progress,
+    )
+    print(f"Exported {stats}")
+    return 0
+
+
+def report_migration(migration):
+    print(f"Applying {migration.VERSION}: {migration.DESCRIPTION}", file=sys.stderr)
+
+
+def migrate_schema(db_handler, args):
+    if args.status:
+        print(f"Schema version {db_handler.schema_version()} of {LATEST_VERSION}")
+        for migration in db_handler.pending_migrations():
+            print(f"Pending {migration.VERSION}: {migration.DESCRIPTION}")
+        return 0
+
+    try:
+        applied = db_handler.migrate(progress=report_migration)
+    except MigrationError as e:
+        print(e, file=sys.stderr)
+        return 1
+
+    print(
+        f"Applied {len(applied)} migrations, "
+        f"schema version {db_handler.schema_version()}"
+    )
+    return 0
+
+
+def sync_replica(db_handler, args):
+    replica = ReplicaDatabaseHandler(args.replica, db_handler.engine.url)
+    try:
+        stats = replica.sync()
+        status = replica.sync_status()
+    finally:
+        replica.dispose()
+
+    if stats is None:
+        print(f"Sync failed: {status['last_error']}", file=sys.stderr)
+        return 1
+
+    print(
+        f"Pushed {stats['pushed']}, pulled {stats['pulled']}, "
+        f"deleted {stats['deleted']}, conflicts {stats['conflicts']}"
+    )
+    return 0
+
+
+def connect(args):
+    auto_migrate = getattr(args, "auto_migrate", True)
+    if args.url:
+        return DatabaseHandler(args.url, auto_migrate=auto_migrate)
+
+    settings = load_connection_settings() or {}
+    if args.host or args.user or args.password is not None:
+        settings = {
+            "username": args.user or settings.get("username"),
+            "password": (
+                args.password if args.password is not None else settings.get("password")
+            ),
+            "host": args.host or settings.get("host"),
+        }
+    return DatabaseHandler(
+        connection_url(settings, args.database), auto_migrate=auto_migrate
+    )
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+
+    try:
+        db_handler = connect(args)
+    except Exception as e:
+        print(f"Unable to connect to the database: {e}", file=sys.stderr)
+        return 1
+
+    try:
+        return args.handler(db_handler, args)
+    finally:
+        db_handler.dispose()
+        if args.metrics_out:
+            metrics.dump(args.metrics_out)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
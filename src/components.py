@@ -1,20 +1,125 @@
-import os
-import sys
-import configparser
+from concurrent.futures import Future
 from PyQt5.QtWidgets import (
     QPushButton,
     QLineEdit,
     QDialog,
     QFormLayout,
     QMessageBox,
+    QVBoxLayout,
+    QHBoxLayout,
+    QLabel,
+    QTableWidget,
+    QTableWidgetItem,
+    QHeaderView,
+    QFileDialog,
+    QRadioButton,
+    QApplication,
 )
-from PyQt5.QtCore import QSize
-from .database import DatabaseHandler
+from PyQt5.QtCore import Qt, QSize
+from PyQt5.QtGui import QPalette, QColor
+from .config import (
+    connection_url,
+    get_config_path,
+    load_connection_settings,
+    save_connection_settings,
+)
+
+BASE_FONT_SIZE = 16
+
+
+def open_database(settings):
+    # SQLAlchemy takes a few hundred milliseconds to import, so it is loaded
+    # on the first connection (usually the prewarm thread), not at startup.
+    from .database import DatabaseHandler
+
+    if replica := settings.get("replica"):
+        from .replica import ReplicaDatabaseHandler
+
+        db_handler = ReplicaDatabaseHandler(replica, connection_url(settings))
+        db_handler.start_sync()
+        return db_handler
+    return DatabaseHandler(connection_url(settings))
+
+
+def prewarm_database(future, settings):
+    if not future.set_running_or_notify_cancel():
+        return
+    try:
+        future.set_result(open_database(settings))
+    except Exception as e:
+        future.set_exception(e)
+
+
+def dispose_prewarmed(future):
+    if not future.cancelled() and future.exception() is None:
+        future.result().dispose()
+
+
+def apply_dark_theme():
+    # Colours and the default font go through the application palette and
+    # font, which Qt propagates cheaply, instead of a universal "*" style
+    # rule that every widget has to match again on each polish.
+    palette = QPalette()
+    for role in (
+        QPalette.Window,
+        QPalette.Base,
+        QPalette.AlternateBase,
+        QPalette.Button,
+        QPalette.ToolTipBase,
+    ):
+        palette.setColor(role, QColor("#2e2e2e"))
+    for role in (
+        QPalette.WindowText,
+        QPalette.Text,
+        QPalette.ButtonText,
+        QPalette.ToolTipText,
+        QPalette.BrightText,
+    ):
+        palette.setColor(role, QColor("#ffffff"))
+    QApplication.setPalette(palette)
+
+    font = QApplication.font()
+    font.setPointSize(BASE_FONT_SIZE)
+    QApplication.setFont(font)
 
 
 class DbConnectionHandler:
     def __init__(self):
         self.db_handler = None
+        self.prewarming = None
+
+    def prewarm(self, executor):
+        # Connect with the saved settings while the start screen is showing, so
+        # the handler is usually ready by the time the dialog is confirmed.
+        if not (settings := load_connection_settings(self.get_config_path())):
+            return
+
+        future = Future()
+        self.prewarming = (settings, future)
+        executor.submit(prewarm_database, future, settings, key="prewarm")
+
+    def take_prewarmed(self, settings):
+        if self.prewarming is None:
+            return None
+
+        prewarm_settings, future = self.prewarming
+        self.prewarming = None
+        if prewarm_settings != settings or future.cancel():
+            future.add_done_callback(dispose_prewarmed)
+            return None
+
+        # Opening a second connection would race the prewarm's migration, so
+        # wait for the one in flight instead.
+        QApplication.setOverrideCursor(Qt.WaitCursor)
+        try:
+            return future.result()
+        finally:
+            QApplication.restoreOverrideCursor()
+
+    def discard_prewarmed(self):
+        if self.prewarming is not None:
+            self.prewarming[1].add_done_callback(dispose_prewarmed)
+            self.prewarming = None
 
     def setup_database_connection(self, main_window):
         while True:
@@ -24,12 +129,17 @@ class DbConnectionHandler:
             if db_setup_dialog.exec_() != QDialog.Accepted:
                 break
 
-            username = db_setup_dialog.username_input.text()
-            password = db_setup_dialog.password_input.text()
-            host = db_setup_dialog.host_input.text()
+            settings = {
+                "username": db_setup_dialog.username_input.text(),
+                "password": db_setup_dialog.password_input.text(),
+                "host": db_setup_dialog.host_input.text(),
+                "url": db_setup_dialog.url_input.text().strip(),
+                "replica": db_setup_dialog.replica_input.text().strip(),
+            }
 
             try:
-                self.db_handler = DatabaseHandler(host, username, password, "PyQtLMS")
+                db_handler = self.take_prewarmed(settings)
+                self.db_handler = db_handler or open_database(settings)
                 return True
             except Exception as e:
                 QMessageBox.critical(
@@ -51,12 +161,7 @@ class DbConnectionHandler:
                     return False
 
     def get_config_path(self):
-        if sys.platform == "win32":
-            return os.path.join(os.getenv("APPDATA"), "PyQtLMS", "db_connection.ini")
-        elif sys.platform == "linux":
-            return os.path.join(
-                os.getenv("HOME"), ".config", "PyQtLMS", "db_connection.ini"
-            )
+        return get_config_path()
 
 
 class DbSetupDialog(QDialog):
@@ -75,10 +180,18 @@ class DbSetupDialog(QDialog):
         self.username_input = QLineEdit()
         self.password_input = QLineEdit()
         self.host_input = QLineEdit()
+        self.url_input = QLineEdit()
+        self.url_input.setPlaceholderText("Optional, e.g. sqlite:///books.db")
+        self.replica_input = QLineEdit()
+        self.replica_input.setPlaceholderText(
+            "Optional local SQLite file for offline use"
+        )
 
         layout.addRow("Username:", self.username_input)
         layout.addRow("Password:", self.password_input)
         layout.addRow("Host:", self.host_input)
+        layout.addRow("URL:", self.url_input)
+        layout.addRow("Replica:", self.replica_input)
 
         save_button = QPushButton("OK")
         save_button.clicked.connect(self.save_config)
@@ -89,11 +202,6 @@ class DbSetupDialog(QDialog):
 
         self.setStyleSheet(
             """
-            * {
-                background-color: #2e2e2e;
-                color: #ffffff;
-                font-size: 16pt;
-            }
             QDialog {
                 border: 1px solid #555555;
             }
@@ -117,26 +225,193 @@ class DbSetupDialog(QDialog):
         )
 
     def load_config(self):
-        config = configparser.ConfigParser()
-
-        if os.path.exists(self.config_path):
-            config.read(self.config_path)
-            self.username_input.setText(config.get("Database", "Username"))
-            self.password_input.setText(config.get("Database", "Password"))
-            self.host_input.setText(config.get("Database", "Host"))
+        if settings := load_connection_settings(self.config_path):
+            self.username_input.setText(settings["username"])
+            self.password_input.setText(settings["password"])
+            self.host_input.setText(settings["host"])
+            self.url_input.setText(settings["url"])
+            self.replica_input.setText(settings["replica"])
 
     def save_config(self):
-        config = configparser.ConfigParser()
-        config.add_section("Database")
-        config.set("Database", "Username", self.username_input.text())
-        config.set("Database", "Password", self.password_input.text())
-        config.set("Database", "Host", self.host_input.text())
+        save_connection_settings(
+            self.username_input.text(),
+            self.password_input.text(),
+            self.host_input.text(),
+            self.url_input.text().strip(),
+            self.config_path,
+            self.replica_input.text().strip(),
+        )
+
+        self.accept()
+
+
+class BulkEditDialog(QDialog):
+    def __init__(
+        self, selected_count, matching_count=None, filtered=False, parent=None
+    ):
+        super().__init__(parent)
+
+        self.selected_count = selected_count
+        self.matching_count = matching_count
+        self.filtered = filtered
+        self.price_percent = None
+        self.year = None
+        self.selected_only = selected_count > 0
+        self.setup_layout()
 
-        config_dir = os.path.dirname(self.config_path)
-        if not os.path.exists(config_dir):
-            os.makedirs(config_dir)
+    def setup_layout(self):
+        self.setWindowTitle("Bulk Edit")
+        self.setMinimumSize(QSize(600, 300))
+        layout = QFormLayout()
+
+        self.price_percent_input = QLineEdit()
+        self.price_percent_input.setPlaceholderText("e.g. 10 or -15")
+        self.year_input = QLineEdit()
+        self.year_input.setPlaceholderText("Leave empty to keep")
+
+        self.selected_radio = QRadioButton(f"Selected books ({self.selected_count})")
+        self.selected_radio.setEnabled(self.selected_count > 0)
+        if self.filtered:
+            matching = "All books shown by the filter"
+        else:
+            matching = "All books matching the current search"
+        if self.matching_count is not None:
+            matching += f" ({self.matching_count})"
+        self.filter_radio = QRadioButton(matching)
+        self.selected_radio.setChecked(self.selected_count > 0)
+        self.filter_radio.setChecked(self.selected_count == 0)
+
+        layout.addRow("Price change (%):", self.price_percent_input)
+        layout.addRow("Set year:", self.year_input)
+        layout.addRow(self.selected_radio)
+        layout.addRow(self.filter_radio)
+
+        apply_button = QPushButton("Apply")
+        apply_button.clicked.connect(self.apply)
+        layout.addRow(apply_button)
+
+        self.setLayout(layout)
 
-        with open(self.config_path, "w") as config_file:
-            config.write(config_file)
+    def apply(self):
+        price_percent = self.price_percent_input.text().strip()
+        year = self.year_input.text().strip()
 
+        try:
+            if not price_percent and not year:
+                raise ValueError("Enter a price change or a year.")
+            if price_percent:
+                price_percent = float(price_percent)
+                if price_percent <= -100:
+                    raise ValueError("Price change must be greater than -100%.")
+            if year:
+                year = int(year)
+                if year < 1900 or year > 2024:
+                    raise ValueError("Year must be between 1900 and 2024.")
+        except ValueError as e:
+            QMessageBox.critical(self, "Error", str(e), QMessageBox.Ok)
+            return
+
+        self.price_percent = price_percent if price_percent != "" else None
+        self.year = year if year != "" else None
+        self.selected_only = self.selected_radio.isChecked()
         self.accept()
+
+
+class DiagnosticsDialog(QDialog):
+    COLUMNS = ["Name", "Count", "Total (ms)", "Mean (ms)", "Max (ms)", "Rows"]
+
+    def __init__(self, metrics, get_db_handler, parent=None):
+        super().__init__(parent)
+
+        self.metrics = metrics
+        self.get_db_handler = get_db_handler
+        self.setup_layout()
+
+    def setup_layout(self):
+        self.setWindowTitle("Diagnostics")
+        self.setMinimumSize(QSize(1200, 800))
+
+        self.cache_label = QLabel()
+        self.query_table = self.create_table()
+        self.span_table = self.create_table()
+
+        refresh_button = QPushButton("Refresh")
+        refresh_button.clicked.connect(self.refresh)
+        reset_button = QPushButton("Reset")
+        reset_button.clicked.connect(self.reset)
+        save_button = QPushButton("Save...")
+        save_button.clicked.connect(self.save)
+
+        button_layout = QHBoxLayout()
+        button_layout.addWidget(refresh_button)
+        button_layout.addWidget(reset_button)
+        button_layout.addWidget(save_button)
+
+        layout = QVBoxLayout()
+        layout.addWidget(QLabel("Queries"))
+        layout.addWidget(self.query_table, 2)
+        layout.addWidget(QLabel("Timings"))
+        layout.addWidget(self.span_table, 1)
+        layout.addWidget(self.cache_label)
+        layout.addLayout(button_layout)
+
+        self.setLayout(layout)
+
+    def create_table(self):
+        table = QTableWidget(0, len(self.COLUMNS))
+        table.setHorizontalHeaderLabels(self.COLUMNS)
+        table.setEditTriggers(QTableWidget.NoEditTriggers)
+        table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+        table.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
+        return table
+
+    def fill_table(self, table, rows):
+        table.setRowCount(len(rows))
+        for row, item in enumerate(rows):
+            values = [
+                item["name"],
+                str(item["count"]),
+                f"{item['total_ms']:.1f}",
+                f"{item['mean_ms']:.2f}",
+                f"{item['max_ms']:.2f}",
+                str(item["rows"]),
+            ]
+            for column, value in enumerate(values):
+                cell = QTableWidgetItem(value)
+                if column == 0:
+                    cell.setToolTip(value)
+                table.setItem(row, column, cell)
+
+    def refresh(self):
+        snapshot = self.metrics.snapshot()
+        self.fill_table(self.query_table, snapshot["queries"])
+        self.fill_table(self.span_table, snapshot["spans"])
+
+        if db_handler := self.get_db_handler():
+            cache = db_handler.book_cache.stats()
+            self.cache_label.setText(
+                f"ISBN cache: {cache['hits']} hits, {cache['misses']} misses, "
+                f"{cache['size']}/{cache['maxsize']} entries. "
+                f"Slow queries: {len(snapshot['slow_queries'])}"
+            )
+            if hasattr(db_handler, "sync_status"):
+                sync = db_handler.sync_status()
+                self.cache_label.setText(
+                    self.cache_label.text()
+                    + f"\nReplica: {'online' if sync['online'] else 'offline'}, "
+                    f"{sync['pending']} changes pending, "
+                    f"{sync['conflicts']} conflicts"
+                )
+        else:
+            self.cache_label.setText("Not connected.")
+
+    def reset(self):
+        self.metrics.reset()
+        self.refresh()
+
+    def save(self):
+        path, _ = QFileDialog.getSaveFileName(
+            self, "Save Diagnostics", "diagnostics.json", "JSON (*.json)"
+        )
+        if path:
+            self.metrics.dump(path)
@@ -0,0 +1,62 @@
+import os
+import sys
+import configparser
+
+DATABASE_NAME = "PyQtLMS"
+
+
+def get_config_path():
+    if sys.platform == "win32":
+        return os.path.join(os.getenv("APPDATA"), "PyQtLMS", "db_connection.ini")
+    return os.path.join(os.getenv("HOME"), ".config", "PyQtLMS", "db_connection.ini")
+
+
+def load_connection_settings(config_path=None):
+    config_path = config_path or get_config_path()
+    if not os.path.exists(config_path):
+        return None
+
+    config = configparser.ConfigParser()
+    config.read(config_path)
+    return {
+        "username": config.get("Database", "Username"),
+        "password": config.get("Database", "Password"),
+        "host": config.get("Database", "Host"),
+        "url": config.get("Database", "URL", fallback=""),
+        "replica": config.get("Database", "Replica", fallback=""),
+    }
+
+
+def connection_url(settings, database=DATABASE_NAME):
+    if settings.get("url"):
+        return settings["url"]
+
+    from .backends import mysql_url
+
+    return mysql_url(
+        settings.get("host") or "localhost",
+        settings.get("username") or "root",
+        settings.get("password") or "",
+        database,
+    )
+
+
+def save_connection_settings(
+    username, password, host, url="", config_path=None, replica=""
+):
+    config_path = config_path or get_config_path()
+
+    config = configparser.ConfigParser()
+    config.add_section("Database")
+    config.set("Database", "Username", username)
+    config.set("Database", "Password", password)
+    config.set("Database", "Host", host)
+    config.set("Database", "URL", url)
+    config.set("Database", "Replica", replica)
+
+    config_dir = os.path.dirname(config_path)
+    if not os.path.exists(config_dir):
+        os.makedirs(config_dir)
+
+    with open(config_path, "w") as config_file:
+        config.write(config_file)
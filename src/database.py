@@ -1,66 +1,769 @@
+import math
+import time
 import random
-from sqlalchemy import create_engine
+from contextlib import contextmanager
+from sqlalchemy import (
+    insert,
+    select,
+    update,
+    delete,
+    exists,
+    case,
+    func,
+    literal,
+    distinct,
+    desc,
+    bindparam,
+    null,
+    or_,
+)
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy.exc import SQLAlchemyError
-from .models import Base, Book
-from faker import Faker
+from sqlalchemy.dialects import mysql, sqlite
+from sqlalchemy.exc import SQLAlchemyError, IntegrityError
+from .models import Book, BookRow, BookTombstone, BookHistory, now_ms
+from .backends import create_backend_engine
+from .search import BookQuery
+from .cache import LRUCache, MISSING
+from .instrumentation import metrics, timed
+from .resilience import retry_transient
+from .migrations import migrate, current_version, pending_migrations
+from .utils import format_idr
 
-fake = Faker()
+_faker = None
+
+PAGE_SIZE = 200
+SEED_BATCH_SIZE = 5000
+# Consecutive batches that insert nothing before seeding gives up, e.g. when
+# the random ISBN space is exhausted.
+SEED_MAX_EMPTY_BATCHES = 10
+
+POOL_SIZE = 5
+POOL_MAX_OVERFLOW = 10
+POOL_RECYCLE = 3600
+POOL_TIMEOUT = 30
+
+BOOK_CACHE_SIZE = 4096
+STATS_CACHE_SIZE = 16
+
+TOP_AUTHORS = 10
+YEAR_BUCKET = 10
+PRICE_PERCENTILES = (25, 50, 75, 90)
+
+HISTORY_PAGE_SIZE = 100
+
+# Bound on IN (...) list size; SQLite limits the number of bound parameters.
+IN_CLAUSE_CHUNK_SIZE = 10000
+
+MIN_PRICE = 1
+MAX_PRICE = 1000000
+
+BOOK_ROW_COLUMNS = (
+    Book.ISBN,
+    Book.title,
+    Book.author,
+    Book.year_published,
+    Book.price,
+)
+
+BOOK_EDIT_FIELDS = ("title", "author", "year_published", "price")
+
+HISTORY_COLUMNS = [
+    "ISBN",
+    "action",
+    "changed_at",
+    *(f"old_{name}" for name in BOOK_EDIT_FIELDS),
+    *(f"new_{name}" for name in BOOK_EDIT_FIELDS),
+]
+
+CHANGE_INSERT = "insert"
+CHANGE_UPDATE = "update"
+CHANGE_DELETE = "delete"
+CHANGE_RESET = "reset"
+
+
+def get_faker():
+    # Building a Faker instance loads every locale provider, which is slow and
+    # only needed when random books are generated.
+    global _faker
+    if _faker is None:
+        from faker import Faker
+
+        _faker = Faker()
+    return _faker
+
+
+def chunked(items, size):
+    for start in range(0, len(items), size):
+        yield items[start : start + size]
 
 
 class DatabaseHandler:
-    def __init__(self, host, user, password, database):
+    def __init__(
+        self,
+        url,
+        pool_size=POOL_SIZE,
+        max_overflow=POOL_MAX_OVERFLOW,
+        pool_pre_ping=True,
+        pool_recycle=POOL_RECYCLE,
+        pool_timeout=POOL_TIMEOUT,
+        cache_size=BOOK_CACHE_SIZE,
+        auto_migrate=True,
+    ):
+        self._change_listeners = []
+        self.book_cache = LRUCache(cache_size)
+        self.stats_cache = LRUCache(STATS_CACHE_SIZE)
         try:
-            self.engine = create_engine(
-                f"mysql+mysqlconnector://{user}:{password}@{host}/{database}"
+            self.engine = create_backend_engine(
+                url,
+                pool_size=pool_size,
+                max_overflow=max_overflow,
+                pool_pre_ping=pool_pre_ping,
+                pool_recycle=pool_recycle,
+                pool_timeout=pool_timeout,
             )
-            Base.metadata.create_all(self.engine)
-            Session = sessionmaker(bind=self.engine)
-            self.session = Session()
+            metrics.attach(self.engine)
+            self.Session = sessionmaker(bind=self.engine, expire_on_commit=False)
+            if auto_migrate:
+                self.migrate()
         except SQLAlchemyError as err:
             print(f"Database Error: {err}")
             raise
 
+    def schema_version(self):
+        return current_version(self.engine)
+
+    def pending_migrations(self):
+        return pending_migrations(self.engine)
+
+    def migrate(self, progress=None):
+        # Up-to-date databases cost a single query against the version marker.
+        applied = migrate(self.engine, progress)
+        if applied:
+            self.notify_changes(CHANGE_RESET)
+        return applied
+
+    @contextmanager
+    def session_scope(self):
+        session = self.Session()
+        try:
+            yield session
+            session.commit()
+        except BaseException:
+            try:
+                session.rollback()
+            except SQLAlchemyError:
+                # The connection died with the transaction; drop it from the
+                # pool instead of masking the original error.
+                session.invalidate()
+            raise
+        finally:
+            session.close()
+
+    def ping(self):
+        # Health check round trip; pre-ping swaps out a connection the server
+        # has dropped, so a recovered server answers on the first call.
+        start = time.perf_counter()
+        with self.engine.connect() as connection:
+            connection.exec_driver_sql("SELECT 1")
+        return (time.perf_counter() - start) * 1000
+
+    def dispose(self):
+        self.engine.dispose()
+
+    def add_change_listener(self, listener):
+        self._change_listeners.append(listener)
+
+    def remove_change_listener(self, listener):
+        if listener in self._change_listeners:
+            self._change_listeners.remove(listener)
+
+    def notify_changes(self, kind, isbns=()):
+        isbns = list(isbns)
+        self.stats_cache.clear()
+        if kind == CHANGE_RESET:
+            self.book_cache.clear()
+        else:
+            for isbn in isbns:
+                self.book_cache.invalidate(isbn)
+
+        for listener in list(self._change_listeners):
+            listener(kind, isbns)
+
+    @retry_transient(idempotent=False)
     def insert_book(self, isbn, title, author, year, price):
-        new_book = Book(
-            ISBN=isbn, title=title, author=author, year_published=year, price=price
+        row = {
+            "ISBN": isbn,
+            "title": title,
+            "author": author,
+            "year_published": year,
+            "price": price,
+        }
+        with self.session_scope() as session:
+            self._record_row_history(session, [row], (CHANGE_INSERT,))
+            session.add(
+                Book(
+                    ISBN=isbn,
+                    title=title,
+                    author=author,
+                    year_published=year,
+                    price=price,
+                )
+            )
+        self.notify_changes(CHANGE_INSERT, [isbn])
+
+    def insert_new_book(self, isbn, title, author, year, price):
+        # The existence check is only a fast path; the primary key decides
+        # when two adds of the same ISBN race.
+        if self.is_isbn_duplicate(isbn):
+            return False
+        try:
+            self.insert_book(isbn, title, author, year, price)
+        except IntegrityError:
+            return False
+        return True
+
+    def _record_deletions(self, session, condition=None):
+        # Tombstones let replicas pull deletions and history keeps the deleted
+        # values; both are written in the same transaction as the DELETE.
+        self._record_history(session, CHANGE_DELETE, condition)
+        statement = select(Book.ISBN, literal(now_ms()))
+        if condition is not None:
+            statement = statement.where(condition)
+        session.execute(
+            insert(BookTombstone.__table__).from_select(
+                ["ISBN", "deleted_at"], statement
+            )
+        )
+
+    def _record_history(self, session, action, condition=None, query=None, values=None):
+        # One INSERT ... SELECT per statement it describes: old values come
+        # from the rows about to change, new values from the same expressions
+        # the UPDATE applies.
+        if values is None:
+            new_values = [null()] * len(BOOK_EDIT_FIELDS)
+        else:
+            new_values = [
+                values.get(name, getattr(Book, name)) for name in BOOK_EDIT_FIELDS
+            ]
+        statement = select(
+            Book.ISBN,
+            literal(action),
+            literal(now_ms()),
+            *(getattr(Book, name) for name in BOOK_EDIT_FIELDS),
+            *new_values,
+        )
+        if condition is not None:
+            statement = statement.where(condition)
+        if values is not None:
+            # Rows the update leaves as they are, e.g. a price already at the
+            # cap or a retried edit, are not logged.
+            statement = statement.where(
+                or_(*(getattr(Book, name) != value for name, value in values.items()))
+            )
+        if query is not None:
+            statement = query.filter(statement, self.engine.dialect.name)
+        session.execute(
+            insert(BookHistory.__table__).from_select(HISTORY_COLUMNS, statement)
         )
-        self.session.add(new_book)
-        self.session.commit()
+
+    def _record_row_history(
+        self, session, rows, actions=(CHANGE_INSERT, CHANGE_UPDATE)
+    ):
+        # For writes that carry new values per row: one executemany
+        # INSERT ... SELECT per action. Inserts are logged only for books
+        # that do not exist yet, updates only for books whose values change.
+        isbn = bindparam("h_isbn", type_=Book.ISBN.type)
+        new_values = [
+            bindparam(f"h_{name}", type_=getattr(Book, name).type)
+            for name in BOOK_EDIT_FIELDS
+        ]
+        statements = []
+        if CHANGE_INSERT in actions:
+            statements.append(
+                select(
+                    isbn,
+                    literal(CHANGE_INSERT),
+                    literal(now_ms()),
+                    *[null()] * len(BOOK_EDIT_FIELDS),
+                    *new_values,
+                ).where(~exists().where(Book.ISBN == isbn))
+            )
+        if CHANGE_UPDATE in actions:
+            old_values = [getattr(Book, name) for name in BOOK_EDIT_FIELDS]
+            statements.append(
+                select(
+                    Book.ISBN,
+                    literal(CHANGE_UPDATE),
+                    literal(now_ms()),
+                    *old_values,
+                    *new_values,
+                ).where(
+                    Book.ISBN == isbn,
+                    or_(*(old != new for old, new in zip(old_values, new_values))),
+                )
+            )
+
+        parameters = [
+            {"h_isbn": row["ISBN"]}
+            | {f"h_{name}": row[name] for name in BOOK_EDIT_FIELDS}
+            for row in rows
+        ]
+        for statement in statements:
+            session.execute(
+                insert(BookHistory.__table__).from_select(HISTORY_COLUMNS, statement),
+                parameters,
+            )
+
+    @retry_transient()
+    def _select_rows(self, statement):
+        with self.session_scope() as session:
+            return [
+                BookRow(*row, format_idr(row[4])) for row in session.execute(statement)
+            ]
 
     def load_all_books(self):
-        return self.session.query(Book).all()
+        return self._select_rows(select(*BOOK_ROW_COLUMNS).order_by(Book.ISBN))
+
+    def load_books_page(self, after_isbn=None, limit=PAGE_SIZE):
+        statement = select(*BOOK_ROW_COLUMNS).order_by(Book.ISBN)
+        if after_isbn is not None:
+            statement = statement.where(Book.ISBN > after_isbn)
+        return self._select_rows(statement.limit(limit))
+
+    def search_books(self, query=None, after=None, limit=PAGE_SIZE):
+        query = query or BookQuery()
+        statement = query.apply(select(*BOOK_ROW_COLUMNS), self.engine.dialect.name)
+        return self._select_rows(query.after(statement, after).limit(limit))
 
+    def load_book_rows(self, isbns):
+        rows = []
+        for chunk in chunked(list(isbns), IN_CLAUSE_CHUNK_SIZE):
+            rows.extend(
+                self._select_rows(select(*BOOK_ROW_COLUMNS).where(Book.ISBN.in_(chunk)))
+            )
+        return rows
+
+    def stream_book_rows(self, batch_size=1000):
+        statement = (
+            select(*BOOK_ROW_COLUMNS)
+            .order_by(Book.ISBN)
+            .execution_options(stream_results=True, yield_per=batch_size)
+        )
+        with self.session_scope() as session:
+            yield from session.execute(statement)
+
+    def catalogue_stats(
+        self, top_authors=TOP_AUTHORS, year_bucket=YEAR_BUCKET, use_cache=True
+    ):
+        if year_bucket <= 0:
+            raise ValueError("Year bucket must be greater than 0.")
+
+        key = (top_authors, year_bucket)
+        if use_cache and (stats := self.stats_cache.get(key)) is not MISSING:
+            return stats
+
+        version = self.stats_cache.version
+        stats = self._compute_stats(top_authors, year_bucket)
+        self.stats_cache.put(key, stats, version)
+        return stats
+
+    @retry_transient()
+    @timed("db.compute_stats")
+    def _compute_stats(self, top_authors, year_bucket):
+        decade = Book.year_published - Book.year_published % year_bucket
+        with self.session_scope() as session:
+            (
+                count,
+                authors,
+                price_min,
+                price_max,
+                price_avg,
+                year_min,
+                year_max,
+            ) = session.execute(
+                select(
+                    func.count(),
+                    func.count(distinct(Book.author)),
+                    func.min(Book.price),
+                    func.max(Book.price),
+                    func.avg(Book.price),
+                    func.min(Book.year_published),
+                    func.max(Book.year_published),
+                )
+            ).one()
+
+            # Neither MySQL nor SQLite has PERCENTILE_CONT; a nearest-rank
+            # percentile is one short walk along the price index each.
+            percentiles = {}
+            for percentile in PRICE_PERCENTILES if count else ():
+                percentiles[percentile] = session.scalar(
+                    select(Book.price)
+                    .order_by(Book.price)
+                    .offset(max(math.ceil(count * percentile / 100) - 1, 0))
+                    .limit(1)
+                )
+
+            books = func.count().label("books")
+            by_author = session.execute(
+                select(Book.author, books)
+                .group_by(Book.author)
+                .order_by(desc(books), Book.author)
+                .limit(top_authors)
+            ).all()
+            by_year = session.execute(
+                select(decade, func.count()).group_by(decade).order_by(decade)
+            ).all()
+
+        return {
+            "count": count,
+            "authors": authors,
+            "price": {
+                "min": price_min,
+                "max": price_max,
+                "avg": float(price_avg) if price_avg is not None else None,
+                "percentiles": percentiles,
+            },
+            "year": {"min": year_min, "max": year_max},
+            "top_authors": [tuple(row) for row in by_author],
+            "years": [tuple(row) for row in by_year],
+        }
+
+    @retry_transient()
     def load_book_by_isbn(self, isbn):
-        return self.session.query(Book).filter(Book.ISBN == isbn).first()
+        if (book := self.book_cache.get(isbn)) is not MISSING:
+            return book
+
+        version = self.book_cache.version
+        with self.session_scope() as session:
+            book = session.get(Book, isbn)
+        # Misses are cached too, so repeated duplicate checks stay local.
+        self.book_cache.put(isbn, book, version)
+        return book
 
+    @retry_transient()
     def update_book(self, isbn, title, author, year, price):
-        if book := self.session.query(Book).filter(Book.ISBN == isbn).first():
-            book.title = title
-            book.author = author
-            book.year_published = year
-            book.price = price
-            self.session.commit()
+        values = {
+            "title": title,
+            "author": author,
+            "year_published": year,
+            "price": price,
+        }
+        statement = (
+            update(Book)
+            .where(Book.ISBN == isbn)
+            .values(values)
+            .execution_options(synchronize_session=False)
+        )
+        with self.session_scope() as session:
+            self._record_history(
+                session,
+                CHANGE_UPDATE,
+                Book.ISBN == isbn,
+                values={name: literal(value) for name, value in values.items()},
+            )
+            updated = session.execute(statement).rowcount
+        if updated:
+            self.notify_changes(CHANGE_UPDATE, [isbn])
 
+    @retry_transient()
     def delete_book(self, isbn):
-        if book := self.session.query(Book).filter(Book.ISBN == isbn).first():
-            self.session.delete(book)
-            self.session.commit()
+        statement = (
+            delete(Book)
+            .where(Book.ISBN == isbn)
+            .execution_options(synchronize_session=False)
+        )
+        with self.session_scope() as session:
+            self._record_deletions(session, Book.ISBN == isbn)
+            deleted = session.execute(statement).rowcount
+        if deleted:
+            self.notify_changes(CHANGE_DELETE, [isbn])
 
+    @retry_transient()
+    def delete_books(self, isbns):
+        isbns = list(dict.fromkeys(isbns))
+        deleted = 0
+        with self.session_scope() as session:
+            for chunk in chunked(isbns, IN_CLAUSE_CHUNK_SIZE):
+                self._record_deletions(session, Book.ISBN.in_(chunk))
+                deleted += session.execute(
+                    delete(Book)
+                    .where(Book.ISBN.in_(chunk))
+                    .execution_options(synchronize_session=False)
+                ).rowcount
+        if deleted:
+            self.notify_changes(CHANGE_DELETE, isbns)
+        return deleted
+
+    @retry_transient(idempotent=False)
+    def bulk_update(self, isbns=None, query=None, price_percent=None, year=None):
+        values = {}
+        if price_percent is not None:
+            price = func.round(Book.price * (100 + price_percent) / 100)
+            values["price"] = case(
+                (price < MIN_PRICE, MIN_PRICE),
+                (price > MAX_PRICE, MAX_PRICE),
+                else_=price,
+            )
+        if year is not None:
+            values["year_published"] = literal(year)
+        if not values:
+            return 0
+
+        statement = update(Book).values(values)
+        statement = statement.execution_options(synchronize_session=False)
+
+        updated = 0
+        with self.session_scope() as session:
+            if isbns is not None:
+                isbns = list(dict.fromkeys(isbns))
+                for chunk in chunked(isbns, IN_CLAUSE_CHUNK_SIZE):
+                    self._record_history(
+                        session, CHANGE_UPDATE, Book.ISBN.in_(chunk), values=values
+                    )
+                    updated += session.execute(
+                        statement.where(Book.ISBN.in_(chunk))
+                    ).rowcount
+            else:
+                query = query or BookQuery()
+                self._record_history(session, CHANGE_UPDATE, query=query, values=values)
+                updated = session.execute(
+                    query.filter(statement, self.engine.dialect.name)
+                ).rowcount
+
+        if updated:
+            if isbns is not None:
+                self.notify_changes(CHANGE_UPDATE, isbns)
+            else:
+                self.notify_changes(CHANGE_RESET)
+        return updated
+
+    @retry_transient(idempotent=False)
+    def apply_changes(self, inserts=(), updates=(), deletes=()):
+        # One transaction for a batch of queued edits: a set-based DELETE per
+        # chunk, one executemany INSERT and one executemany UPDATE by ISBN.
+        inserts, updates, deletes = list(inserts), list(updates), list(deletes)
+        statement = (
+            update(Book.__table__)
+            .where(Book.ISBN == bindparam("b_isbn"))
+            .values({name: bindparam(f"b_{name}") for name in BOOK_EDIT_FIELDS})
+        )
+        with self.session_scope() as session:
+            for chunk in chunked(deletes, IN_CLAUSE_CHUNK_SIZE):
+                self._record_deletions(session, Book.ISBN.in_(chunk))
+                session.execute(
+                    delete(Book)
+                    .where(Book.ISBN.in_(chunk))
+                    .execution_options(synchronize_session=False)
+                )
+            if inserts:
+                self._record_row_history(session, inserts, (CHANGE_INSERT,))
+                session.execute(insert(Book.__table__), inserts)
+            if updates:
+                self._record_row_history(session, updates, (CHANGE_UPDATE,))
+                session.execute(
+                    statement,
+                    [
+                        {f"b_{name.lower()}": row[name] for name in row}
+                        for row in updates
+                    ],
+                )
+
+        inserted = {row["ISBN"] for row in inserts}
+        if removed := [isbn for isbn in deletes if isbn not in inserted]:
+            self.notify_changes(CHANGE_DELETE, removed)
+        if inserted:
+            self.notify_changes(CHANGE_INSERT, list(inserted))
+        if updates:
+            self.notify_changes(CHANGE_UPDATE, [row["ISBN"] for row in updates])
+
+    @retry_transient()
     def delete_all_books(self):
-        self.session.query(Book).delete()
-        self.session.commit()
+        with self.session_scope() as session:
+            self._record_deletions(session)
+            session.query(Book).delete()
+        self.notify_changes(CHANGE_RESET)
+
+    @retry_transient()
+    def upsert_books(self, rows):
+        if not rows:
+            return
+
+        table = Book.__table__
+        updated = ["title", "author", "year_published", "price"]
+        # Upserts skip column onupdate rules, so change tracking is explicit.
+        tracking = {"version": table.c.version + 1, "updated_at": now_ms()}
+        dialect = self.engine.dialect.name
+        if dialect == "mysql":
+            statement = mysql.insert(table)
+            statement = statement.on_duplicate_key_update(
+                {name: statement.inserted[name] for name in updated} | tracking
+            )
+        elif dialect == "sqlite":
+            statement = sqlite.insert(table)
+            statement = statement.on_conflict_do_update(
+                index_elements=["ISBN"],
+                set_={name: statement.excluded[name] for name in updated} | tracking,
+            )
+        else:
+            raise NotImplementedError(f"Upsert is not supported on {dialect}.")
+
+        with self.session_scope() as session:
+            self._record_row_history(session, rows)
+            session.execute(statement, rows)
+        self.notify_changes(CHANGE_RESET)
+
+    @retry_transient()
+    def load_history(self, isbn=None, since=None, until=None, limit=HISTORY_PAGE_SIZE):
+        statement = select(BookHistory.__table__)
+        if isbn is not None:
+            statement = statement.where(BookHistory.ISBN == isbn)
+        if since is not None:
+            statement = statement.where(BookHistory.changed_at >= since)
+        if until is not None:
+            statement = statement.where(BookHistory.changed_at < until)
+        statement = statement.order_by(
+            BookHistory.changed_at.desc(), BookHistory.id.desc()
+        ).limit(limit)
+        with self.session_scope() as session:
+            return session.execute(statement).all()
+
+    def restore_change(self, entry_id):
+        # Puts a book back to its values before a history entry. The restore
+        # goes through the normal write paths, so it is recorded and can be
+        # undone the same way.
+        with self.session_scope() as session:
+            entry = session.execute(
+                select(BookHistory.__table__).where(BookHistory.id == entry_id)
+            ).first()
+        if entry is None:
+            raise ValueError(f"No history entry {entry_id}.")
+
+        if entry.action == CHANGE_INSERT:
+            self.delete_book(entry.ISBN)
+            return CHANGE_DELETE
+
+        values = [getattr(entry, f"old_{name}") for name in BOOK_EDIT_FIELDS]
+        if self.is_isbn_duplicate(entry.ISBN):
+            self.update_book(entry.ISBN, *values)
+            return CHANGE_UPDATE
+        self.insert_book(entry.ISBN, *values)
+        return CHANGE_INSERT
+
+    @retry_transient()
+    def restore_deleted_books(self, since, until=None):
+        # Undoes the deletions made in a time range, such as Delete All Books,
+        # with two INSERT ... SELECT statements. A book comes back when its
+        # latest change in the range was a delete and it has not been re-added.
+        now = now_ms()
+        until = now if until is None else min(until, now)
+        latest = (
+            select(func.max(BookHistory.id))
+            .where(BookHistory.changed_at >= since, BookHistory.changed_at < until)
+            .group_by(BookHistory.ISBN)
+        )
+        conditions = (
+            BookHistory.id.in_(latest),
+            BookHistory.action == CHANGE_DELETE,
+            ~exists().where(Book.ISBN == BookHistory.ISBN),
+        )
+        old_values = [getattr(BookHistory, f"old_{name}") for name in BOOK_EDIT_FIELDS]
+
+        with self.session_scope() as session:
+            # History first: rows stamped "now" fall outside the range, and
+            # the books do not exist yet.
+            session.execute(
+                insert(BookHistory.__table__).from_select(
+                    HISTORY_COLUMNS,
+                    select(
+                        BookHistory.ISBN,
+                        literal(CHANGE_INSERT),
+                        literal(now),
+                        *[null()] * len(BOOK_EDIT_FIELDS),
+                        *old_values,
+                    ).where(*conditions),
+                )
+            )
+            restored = session.execute(
+                insert(Book.__table__).from_select(
+                    ["ISBN", *BOOK_EDIT_FIELDS, "version", "updated_at"],
+                    select(
+                        BookHistory.ISBN, *old_values, literal(1), literal(now)
+                    ).where(*conditions),
+                )
+            ).rowcount
+
+        if restored:
+            self.notify_changes(CHANGE_RESET)
+        return restored
 
     def is_isbn_duplicate(self, isbn):
-        return self.session.query(Book).filter(Book.ISBN == isbn).count() > 0
+        # Goes through the ISBN cache so both answers are remembered.
+        return self.load_book_by_isbn(isbn) is not None
 
     def generate_fake_data(self, count):
         for _ in range(count):
-            isbn = fake.isbn13()
-            title = fake.sentence(
-                nb_words=6, variable_nb_words=True, ext_word_list=None
+            self.insert_book(**self.fake_book_row())
+
+    def insert_books(self, rows):
+        inserted = self._insert_ignoring_duplicates(rows)
+        self.notify_changes(CHANGE_RESET)
+        return inserted
+
+    def seed_fake_data(self, count, batch_size=SEED_BATCH_SIZE):
+        inserted = 0
+        remaining = count
+        empty_batches = 0
+        while remaining > 0 and empty_batches < SEED_MAX_EMPTY_BATCHES:
+            size = min(batch_size, remaining)
+            rows = {}
+            while len(rows) < size:
+                row = self.fake_book_row()
+                rows[row["isbn"]] = row
+
+            written = self._insert_ignoring_duplicates(
+                [
+                    {
+                        "ISBN": row["isbn"],
+                        "title": row["title"],
+                        "author": row["author"],
+                        "year_published": row["year"],
+                        "price": row["price"],
+                    }
+                    for row in rows.values()
+                ]
             )
-            author = fake.name()
-            year = random.randint(1900, 2024)
-            price = random.randint(1, 1000000)
-            self.insert_book(isbn, title, author, year, price)
+
+            # Rows dropped by INSERT IGNORE collide with existing ISBNs; the
+            # next batch makes up for them.
+            inserted += written
+            remaining -= written
+            empty_batches = empty_batches + 1 if written == 0 else 0
+
+        self.notify_changes(CHANGE_RESET)
+        return inserted
+
+    @retry_transient()
+    def _insert_ignoring_duplicates(self, rows):
+        if not rows:
+            return 0
+
+        statement = (
+            insert(Book.__table__)
+            .prefix_with("IGNORE", dialect="mysql")
+            .prefix_with("OR IGNORE", dialect="sqlite")
+        )
+        with self.session_scope() as session:
+            result = session.execute(statement, rows)
+        return result.rowcount if result.rowcount >= 0 else len(rows)
+
+    def fake_book_row(self):
+        fake = get_faker()
+        return {
+            "isbn": fake.isbn13(),
+            "title": fake.sentence(
+                nb_words=6, variable_nb_words=True, ext_word_list=None
+            ),
+            "author": fake.name(),
+            "year": random.randint(1900, 2024),
+            "price": random.randint(1, 1000000),
+        }
@@ -0,0 +1,176 @@
+import os
+import re
+import json
+import time
+import logging
+from threading import Lock
+from functools import wraps
+from collections import deque
+from contextlib import contextmanager
+
+logger = logging.getLogger("pyqtlms.performance")
+
+SLOW_QUERY_MS = float(os.getenv("PYQTLMS_SLOW_QUERY_MS", "200"))
+SLOW_QUERY_HISTORY = 50
+STARTUP_TARGET_MS = float(os.getenv("PYQTLMS_STARTUP_TARGET_MS", "500"))
+MAX_QUERY_KEYS = 500
+OTHER_QUERIES = "(other statements)"
+
+# Expanded IN lists and multi-row VALUES differ only in how many placeholders
+# they carry, so they are collapsed to keep one metrics key per statement.
+PLACEHOLDER = r"(?:\?|%s|%\(\w+\)s|:\w+)"
+IN_LIST = re.compile(rf"\bIN \({PLACEHOLDER}(?:, {PLACEHOLDER})*\)", re.IGNORECASE)
+VALUES_LIST = re.compile(r"\bVALUES (\([^()]*\))(?:, \([^()]*\))+", re.IGNORECASE)
+
+
+def statement_key(statement):
+    statement = " ".join(statement.split())
+    statement = IN_LIST.sub("IN (...)", statement)
+    return VALUES_LIST.sub(r"VALUES \1, ...", statement)
+
+
+class Metrics:
+    def __init__(self, slow_query_ms=SLOW_QUERY_MS):
+        self.slow_query_ms = slow_query_ms
+        self._lock = Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.queries = {}
+            self.spans = {}
+            self.slow_queries = deque(maxlen=SLOW_QUERY_HISTORY)
+
+    def attach(self, engine):
+        from sqlalchemy import event
+
+        event.listen(engine, "before_cursor_execute", self._before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", self._after_cursor_execute)
+        event.listen(engine, "handle_error", self._handle_error)
+
+    def _before_cursor_execute(
+        self, conn, cursor, statement, parameters, context, executemany
+    ):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    def _after_cursor_execute(
+        self, conn, cursor, statement, parameters, context, executemany
+    ):
+        seconds = time.perf_counter() - conn.info["query_started"].pop()
+        self.record_query(statement, seconds, cursor.rowcount)
+
+    def _handle_error(self, exception_context):
+        if connection := exception_context.connection:
+            if started := connection.info.get("query_started"):
+                started.pop()
+
+    def record_query(self, statement, seconds, rows=-1):
+        with self._lock:
+            key = statement_key(statement)
+            if key not in self.queries and len(self.queries) >= MAX_QUERY_KEYS:
+                key = OTHER_QUERIES
+            stats = _accumulate(self.queries, key, seconds)
+            if rows >= 0:
+                stats["rows"] += rows
+
+            if seconds * 1000 >= self.slow_query_ms:
+                self.slow_queries.append(
+                    {"statement": statement, "ms": seconds * 1000, "at": time.time()}
+                )
+                logger.warning("Slow query (%.1f ms): %s", seconds * 1000, statement)
+
+    def record_span(self, name, seconds):
+        with self._lock:
+            _accumulate(self.spans, name, seconds)
+
+    @contextmanager
+    def span(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record_span(name, time.perf_counter() - start)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "queries": _summarize(self.queries),
+                "spans": _summarize(self.spans),
+                "slow_queries": list(self.slow_queries),
+            }
+
+    def dump(self, path):
+        with open(path, "w") as output:
+            json.dump(self.snapshot(), output, indent=2)
+
+
+def _accumulate(table, name, seconds):
+    stats = table.setdefault(name, {"count": 0, "total": 0.0, "max": 0.0, "rows": 0})
+    stats["count"] += 1
+    stats["total"] += seconds
+    stats["max"] = max(stats["max"], seconds)
+    return stats
+
+
+def _summarize(table):
+    summary = [
+        {
+            "name": name,
+            "count": stats["count"],
+            "total_ms": stats["total"] * 1000,
+            "mean_ms": stats["total"] / stats["count"] * 1000,
+            "max_ms": stats["max"] * 1000,
+            "rows": stats["rows"],
+        }
+        for name, stats in table.items()
+    ]
+    return sorted(summary, key=lambda item: item["total_ms"], reverse=True)
+
+
+metrics = Metrics()
+
+
+class StartupTimer:
+    def __init__(self, target_ms=STARTUP_TARGET_MS):
+        self.target_ms = target_ms
+        self.start()
+
+    def start(self, started=None):
+        self.started = started if started is not None else time.perf_counter()
+        self.marks = []
+        self.finished = False
+
+    def mark(self, stage):
+        elapsed = time.perf_counter() - self.started
+        self.marks.append((stage, elapsed * 1000))
+        metrics.record_span(f"startup.{stage}", elapsed)
+        logger.info("Startup: %s after %.1f ms", stage, elapsed * 1000)
+        return elapsed * 1000
+
+    def finish(self, stage="ready"):
+        if self.finished:
+            return
+        self.finished = True
+
+        elapsed_ms = self.mark(stage)
+        if elapsed_ms > self.target_ms:
+            logger.warning(
+                "Startup took %.1f ms, over the %.0f ms target",
+                elapsed_ms,
+                self.target_ms,
+            )
+
+
+startup = StartupTimer()
+
+
+def timed(name):
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with metrics.span(name):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,114 @@
+import pkgutil
+from contextlib import contextmanager
+from importlib import import_module
+from sqlalchemy import select, insert, func, inspect, text
+from sqlalchemy.exc import SQLAlchemyError
+from ..models import SchemaVersion
+
+
+MIGRATION_LOCK = "pyqtlms_migrate"
+MIGRATION_LOCK_TIMEOUT = 600
+
+
+class MigrationError(Exception):
+    pass
+
+
+def load_migrations():
+    # Each vNNN_*.py module defines VERSION, DESCRIPTION and upgrade(connection).
+    migrations = [
+        import_module(f"{__name__}.{module.name}")
+        for module in pkgutil.iter_modules(__path__)
+        if module.name.startswith("v")
+    ]
+    return sorted(migrations, key=lambda migration: migration.VERSION)
+
+
+MIGRATIONS = load_migrations()
+LATEST_VERSION = MIGRATIONS[-1].VERSION
+
+
+def current_version(engine):
+    with engine.connect() as connection:
+        try:
+            return connection.scalar(select(func.max(SchemaVersion.version))) or 0
+        except SQLAlchemyError:
+            # No marker table yet: an empty database or one from before migrations.
+            return 0
+
+
+def pending_migrations(engine):
+    version = current_version(engine)
+    return [migration for migration in MIGRATIONS if migration.VERSION > version]
+
+
+@contextmanager
+def migration_lock(engine):
+    # Every client migrates on connect, so only one may run the upgrades; the
+    # others wait here and then find nothing left to do.
+    with engine.connect() as connection:
+        dialect = connection.dialect.name
+        if dialect == "mysql":
+            acquired = connection.scalar(
+                text("SELECT GET_LOCK(:name, :timeout)"),
+                {"name": MIGRATION_LOCK, "timeout": MIGRATION_LOCK_TIMEOUT},
+            )
+            if acquired != 1:
+                raise MigrationError("Timed out waiting for another migration.")
+            try:
+                yield connection
+            finally:
+                connection.rollback()
+                connection.scalar(
+                    text("SELECT RELEASE_LOCK(:name)"), {"name": MIGRATION_LOCK}
+                )
+        elif dialect == "sqlite":
+            # SQLite DDL is transactional: the write lock taken here is held
+            # until every pending migration has been committed together.
+            busy_timeout = connection.exec_driver_sql("PRAGMA busy_timeout").scalar()
+            connection.exec_driver_sql(
+                f"PRAGMA busy_timeout = {MIGRATION_LOCK_TIMEOUT * 1000}"
+            )
+            try:
+                connection.exec_driver_sql("BEGIN IMMEDIATE")
+                yield connection
+            finally:
+                connection.rollback()
+                connection.exec_driver_sql(f"PRAGMA busy_timeout = {busy_timeout}")
+        else:
+            raise NotImplementedError(f"Migrations are not supported on {dialect}.")
+
+
+def locked_version(connection):
+    if not inspect(connection).has_table(SchemaVersion.__tablename__):
+        return 0
+    return connection.scalar(select(func.max(SchemaVersion.version))) or 0
+
+
+def migrate(engine, progress=None):
+    # Up-to-date databases cost a single query and never take the lock.
+    if not pending_migrations(engine):
+        return []
+
+    applied = []
+    with migration_lock(engine) as connection:
+        version = locked_version(connection)
+        for migration in MIGRATIONS:
+            if migration.VERSION <= version:
+                continue
+            if progress:
+                progress(migration)
+
+            SchemaVersion.__table__.create(connection, checkfirst=True)
+            migration.upgrade(connection)
+            connection.execute(
+                insert(SchemaVersion.__table__).values(version=migration.VERSION)
+            )
+            # MySQL commits each DDL statement implicitly, so the version row
+            # is committed right after its upgrade; a migration that fails
+            # halfway must be safe to run again. SQLite commits all at once.
+            if connection.dialect.name == "mysql":
+                connection.commit()
+            applied.append(migration)
+        connection.commit()
+    return applied
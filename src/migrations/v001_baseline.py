@@ -0,0 +1,28 @@
+from sqlalchemy import MetaData, Table, Column, String, Integer, Text, Index
+
+VERSION = 1
+DESCRIPTION = "Baseline book table"
+
+metadata = MetaData()
+
+book = Table(
+    "book",
+    metadata,
+    Column("ISBN", String(20), primary_key=True),
+    Column("title", Text, nullable=False),
+    Column("author", String(100), nullable=False),
+    Column("year_published", Integer, nullable=False),
+    Column("price", Integer, nullable=False),
+    Index("ix_book_author", "author"),
+    Index("ix_book_year_published", "year_published"),
+    Index("ix_book_price", "price"),
+    Index("ix_book_title_fulltext", "title", mysql_prefix="FULLTEXT"),
+)
+
+
+def upgrade(connection):
+    # Databases created before migrations already have the table, possibly
+    # without the indexes added after it was first created.
+    metadata.create_all(connection)
+    for index in book.indexes:
+        index.create(connection, checkfirst=True)
@@ -0,0 +1,112 @@
+from sqlalchemy import text
+from . import MigrationError
+
+VERSION = 2
+DESCRIPTION = "Fixed-width ISBN, bounded title, compact numbers and sort indexes"
+
+ISBN_LENGTH = 20
+TITLE_LENGTH = 255
+AUTHOR_LENGTH = 100
+MAX_YEAR = 32767
+MAX_PRICE = 16777215
+
+# Sorting uses (column, ISBN) keysets. InnoDB appends the primary key to
+# secondary indexes anyway, but SQLite indexes hold the rowid, so the ISBN is
+# spelled out to keep the ordering index-only on both.
+SORT_INDEXES = {
+    "ix_book_author": "author",
+    "ix_book_year_published": "year_published",
+    "ix_book_price": "price",
+    "ix_book_title": "title",
+}
+
+MYSQL_UPGRADE = "ALTER TABLE book " + ", ".join(
+    [
+        f"MODIFY ISBN CHAR({ISBN_LENGTH}) NOT NULL",
+        f"MODIFY title VARCHAR({TITLE_LENGTH}) NOT NULL",
+        f"MODIFY author VARCHAR({AUTHOR_LENGTH}) NOT NULL",
+        "MODIFY year_published SMALLINT NOT NULL",
+        "MODIFY price MEDIUMINT UNSIGNED NOT NULL",
+        "DROP INDEX ix_book_author",
+        "DROP INDEX ix_book_year_published",
+        "DROP INDEX ix_book_price",
+        *(
+            f"ADD INDEX {name} ({column}, ISBN)"
+            for name, column in SORT_INDEXES.items()
+        ),
+    ]
+)
+
+SQLITE_UPGRADE = [
+    "DROP TABLE IF EXISTS book_new",
+    f"""
+    CREATE TABLE book_new (
+        "ISBN" CHAR({ISBN_LENGTH}) NOT NULL PRIMARY KEY,
+        title VARCHAR({TITLE_LENGTH}) NOT NULL,
+        author VARCHAR({AUTHOR_LENGTH}) NOT NULL,
+        year_published SMALLINT NOT NULL,
+        price INTEGER NOT NULL
+    )
+    """,
+    """
+    INSERT INTO book_new ("ISBN", title, author, year_published, price)
+    SELECT "ISBN", title, author, year_published, price FROM book
+    """,
+    "DROP TABLE book",
+    "ALTER TABLE book_new RENAME TO book",
+    *(
+        f'CREATE INDEX {name} ON book ({column}, "ISBN")'
+        for name, column in SORT_INDEXES.items()
+    ),
+]
+
+
+def check_rows(connection):
+    length = "CHAR_LENGTH" if connection.dialect.name == "mysql" else "LENGTH"
+    checks = [
+        (f"{length}(ISBN) > {ISBN_LENGTH}", f"ISBNs over {ISBN_LENGTH} characters"),
+        (f"{length}(title) > {TITLE_LENGTH}", f"titles over {TITLE_LENGTH} characters"),
+        (
+            f"{length}(author) > {AUTHOR_LENGTH}",
+            f"authors over {AUTHOR_LENGTH} characters",
+        ),
+        (f"year_published NOT BETWEEN 0 AND {MAX_YEAR}", "years out of range"),
+        (f"price NOT BETWEEN 0 AND {MAX_PRICE}", "prices out of range"),
+    ]
+    # One scan counts every kind of row that would not fit the new layout.
+    counts = connection.execute(
+        text(
+            "SELECT "
+            + ", ".join(
+                f"SUM(CASE WHEN {condition} THEN 1 ELSE 0 END)"
+                for condition, _ in checks
+            )
+            + " FROM book"
+        )
+    ).one()
+    problems = [
+        f"{count} books with {problem}"
+        for count, (_, problem) in zip(counts, checks)
+        if count
+    ]
+
+    if problems:
+        raise MigrationError(
+            "Cannot compact the book table: "
+            + ", ".join(problems)
+            + ". Fix these rows and run the migration again."
+        )
+
+
+def upgrade(connection):
+    check_rows(connection)
+
+    dialect = connection.dialect.name
+    if dialect == "mysql":
+        connection.exec_driver_sql(MYSQL_UPGRADE)
+    elif dialect == "sqlite":
+        # SQLite cannot change column types in place, so the table is rebuilt.
+        for statement in SQLITE_UPGRADE:
+            connection.exec_driver_sql(statement)
+    else:
+        raise NotImplementedError(f"Migrations are not supported on {dialect}.")
@@ -0,0 +1,46 @@
+from sqlalchemy import (
+    MetaData,
+    Table,
+    Column,
+    Integer,
+    BigInteger,
+    CHAR,
+    Index,
+    inspect,
+)
+
+VERSION = 3
+DESCRIPTION = "Book versions, update times and deletion tombstones for replicas"
+
+metadata = MetaData()
+
+book_tombstone = Table(
+    "book_tombstone",
+    metadata,
+    Column("id", Integer, primary_key=True, autoincrement=True),
+    Column("ISBN", CHAR(20), nullable=False),
+    Column("deleted_at", BigInteger, nullable=False),
+    Index("ix_book_tombstone_deleted_at", "deleted_at", "id"),
+)
+
+# Existing rows start at version 1 with an update time of 0, so the first
+# pull of a new replica copies all of them.
+COLUMNS = {
+    "version": "ALTER TABLE book ADD COLUMN version INTEGER NOT NULL DEFAULT 1",
+    "updated_at": "ALTER TABLE book ADD COLUMN updated_at BIGINT NOT NULL DEFAULT 0",
+}
+INDEX = "CREATE INDEX ix_book_updated_at ON book (updated_at, ISBN)"
+
+
+def upgrade(connection):
+    # MySQL commits each ALTER on its own, so every step checks whether an
+    # earlier, interrupted run already made it.
+    inspector = inspect(connection)
+    columns = {column["name"] for column in inspector.get_columns("book")}
+    for name, statement in COLUMNS.items():
+        if name not in columns:
+            connection.exec_driver_sql(statement)
+    indexes = {index["name"] for index in inspector.get_indexes("book")}
+    if "ix_book_updated_at" not in indexes:
+        connection.exec_driver_sql(INDEX)
+    book_tombstone.create(connection, checkfirst=True)
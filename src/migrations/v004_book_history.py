@@ -0,0 +1,42 @@
+from sqlalchemy import (
+    MetaData,
+    Table,
+    Column,
+    Integer,
+    BigInteger,
+    SmallInteger,
+    CHAR,
+    String,
+    Index,
+)
+from sqlalchemy.dialects import mysql
+
+VERSION = 4
+DESCRIPTION = "Append-only change history of book values"
+
+metadata = MetaData()
+
+price = Integer().with_variant(mysql.MEDIUMINT(unsigned=True), "mysql")
+
+book_history = Table(
+    "book_history",
+    metadata,
+    Column("id", Integer, primary_key=True, autoincrement=True),
+    Column("ISBN", CHAR(20), nullable=False),
+    Column("action", String(6), nullable=False),
+    Column("changed_at", BigInteger, nullable=False),
+    Column("old_title", String(255)),
+    Column("old_author", String(100)),
+    Column("old_year_published", SmallInteger),
+    Column("old_price", price),
+    Column("new_title", String(255)),
+    Column("new_author", String(100)),
+    Column("new_year_published", SmallInteger),
+    Column("new_price", price),
+    Index("ix_book_history_isbn", "ISBN", "changed_at"),
+    Index("ix_book_history_changed_at", "changed_at"),
+)
+
+
+def upgrade(connection):
+    book_history.create(connection)
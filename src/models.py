@@ -1,13 +1,98 @@
-from sqlalchemy import Column, String, Integer, Text
+import time
+from collections import namedtuple
+from sqlalchemy import (
+    Column,
+    CHAR,
+    String,
+    Integer,
+    BigInteger,
+    SmallInteger,
+    Index,
+    literal_column,
+)
+from sqlalchemy.dialects import mysql
 from sqlalchemy.orm import declarative_base
+from .utils import ISBN_LENGTH, TITLE_LENGTH, AUTHOR_LENGTH
 
 Base = declarative_base()
 
 
+def now_ms():
+    return time.time_ns() // 1_000_000
+
+
 class Book(Base):
     __tablename__ = "book"
-    ISBN = Column(String(20), primary_key=True)
-    title = Column(Text, nullable=False)
-    author = Column(String(100), nullable=False)
-    year_published = Column(Integer, nullable=False)
-    price = Column(Integer, nullable=False)
+    ISBN = Column(CHAR(ISBN_LENGTH), primary_key=True)
+    title = Column(String(TITLE_LENGTH), nullable=False)
+    author = Column(String(AUTHOR_LENGTH), nullable=False)
+    year_published = Column(SmallInteger, nullable=False)
+    price = Column(
+        Integer().with_variant(mysql.MEDIUMINT(unsigned=True), "mysql"),
+        nullable=False,
+    )
+    # Change tracking for replicas: every write bumps the version and stamps
+    # the time, including set-based UPDATE statements.
+    version = Column(
+        Integer, nullable=False, default=1, onupdate=literal_column("version + 1")
+    )
+    updated_at = Column(BigInteger, nullable=False, default=now_ms, onupdate=now_ms)
+
+    # The schema is created and upgraded by src/migrations; keep this in step
+    # with the latest migration. The sort indexes cover the (column, ISBN)
+    # keyset ordering used by search_books.
+    __table_args__ = (
+        Index("ix_book_author", "author", "ISBN"),
+        Index("ix_book_year_published", "year_published", "ISBN"),
+        Index("ix_book_price", "price", "ISBN"),
+        Index("ix_book_title", "title", "ISBN"),
+        Index("ix_book_updated_at", "updated_at", "ISBN"),
+        Index("ix_book_title_fulltext", "title", mysql_prefix="FULLTEXT").ddl_if(
+            dialect="mysql"
+        ),
+    )
+
+
+class BookTombstone(Base):
+    __tablename__ = "book_tombstone"
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    ISBN = Column(CHAR(ISBN_LENGTH), nullable=False)
+    deleted_at = Column(BigInteger, nullable=False)
+
+    __table_args__ = (Index("ix_book_tombstone_deleted_at", "deleted_at", "id"),)
+
+
+class BookHistory(Base):
+    # Append-only log of book changes. Inserts have no old values and deletes
+    # have no new values; id order is the order the changes were made in.
+    __tablename__ = "book_history"
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    ISBN = Column(CHAR(ISBN_LENGTH), nullable=False)
+    action = Column(String(6), nullable=False)
+    changed_at = Column(BigInteger, nullable=False)
+    old_title = Column(String(TITLE_LENGTH))
+    old_author = Column(String(AUTHOR_LENGTH))
+    old_year_published = Column(SmallInteger)
+    old_price = Column(Integer().with_variant(mysql.MEDIUMINT(unsigned=True), "mysql"))
+    new_title = Column(String(TITLE_LENGTH))
+    new_author = Column(String(AUTHOR_LENGTH))
+    new_year_published = Column(SmallInteger)
+    new_price = Column(Integer().with_variant(mysql.MEDIUMINT(unsigned=True), "mysql"))
+
+    __table_args__ = (
+        Index("ix_book_history_isbn", "ISBN", "changed_at"),
+        Index("ix_book_history_changed_at", "changed_at"),
+    )
+
+
+class SchemaVersion(Base):
+    __tablename__ = "schema_version"
+    version = Column(Integer, primary_key=True)
+
+
+# Read-only projection of a book for list views; the price is formatted once
+# when the row is fetched instead of on every paint.
+BookRow = namedtuple(
+    "BookRow",
+    ["ISBN", "title", "author", "year_published", "price", "price_display"],
+)
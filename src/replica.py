@@ -0,0 +1,525 @@
+import json
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from sqlalchemy import (
+    Column,
+    CHAR,
+    String,
+    Integer,
+    BigInteger,
+    Text,
+    select,
+    insert,
+    update,
+    delete,
+    func,
+    and_,
+    or_,
+)
+from sqlalchemy.dialects import sqlite
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import declarative_base
+from .database import (
+    DatabaseHandler,
+    CHANGE_INSERT,
+    CHANGE_UPDATE,
+    CHANGE_DELETE,
+    IN_CLAUSE_CHUNK_SIZE,
+    chunked,
+)
+from .models import Book, BookTombstone, BookHistory, now_ms
+from .utils import ISBN_LENGTH
+
+logger = logging.getLogger("pyqtlms.replica")
+
+SYNC_INTERVAL = 30
+# Local writes wake the sync thread; waiting briefly lets a burst of edits go
+# out in one push.
+SYNC_WRITE_DELAY = 1
+SYNC_BATCH_SIZE = 500
+# Update times come from each client's clock, so a row can be stamped slightly
+# behind the pull cursor. Every pull re-reads this window; applying a row the
+# replica already has is a no-op.
+SYNC_OVERLAP_MS = 5 * 60 * 1000
+
+BOOK_FIELDS = ["title", "author", "year_published", "price"]
+
+
+class ReplicaOfflineError(Exception):
+    pass
+
+
+# Replica bookkeeping lives only in the local SQLite file, so it is kept out of
+# the shared schema and its migrations.
+ReplicaBase = declarative_base()
+
+
+class OutboxEntry(ReplicaBase):
+    __tablename__ = "replica_outbox"
+    ISBN = Column(CHAR(ISBN_LENGTH), primary_key=True)
+    # Remote version the first unpushed edit was based on; NULL for new books.
+    base_version = Column(Integer)
+    queued_at = Column(BigInteger, nullable=False)
+
+
+class SyncState(ReplicaBase):
+    __tablename__ = "replica_state"
+    id = Column(Integer, primary_key=True)
+    pulled_until = Column(BigInteger, nullable=False, default=0)
+    applying = Column(Integer, nullable=False, default=0)
+
+
+class SyncConflict(ReplicaBase):
+    __tablename__ = "replica_conflict"
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    ISBN = Column(CHAR(ISBN_LENGTH), nullable=False)
+    local = Column(Text)
+    remote = Column(Text)
+    resolution = Column(String(10), nullable=False)
+    resolved_at = Column(BigInteger, nullable=False)
+
+
+# Every local write queues its ISBN in the same transaction, whichever
+# DatabaseHandler method made it. The first queued base version is kept and
+# the queue time follows the latest edit. Changes applied by the sync itself
+# run with replica_state.applying set and are not queued.
+SQLITE_NOW_MS = "CAST((julianday('now') - 2440587.5) * 86400000 AS INTEGER)"
+OUTBOX_TRIGGERS = {
+    "replica_outbox_insert": ("INSERT", "NEW.ISBN", "NULL"),
+    "replica_outbox_update": ("UPDATE", "NEW.ISBN", "OLD.version"),
+    "replica_outbox_delete": ("DELETE", "OLD.ISBN", "OLD.version"),
+}
+OUTBOX_TRIGGER = """
+CREATE TRIGGER IF NOT EXISTS {name} AFTER {event} ON book
+WHEN (SELECT applying FROM replica_state WHERE id = 1) = 0
+BEGIN
+    INSERT INTO replica_outbox (ISBN, base_version, queued_at)
+    VALUES ({isbn}, {base_version}, {now})
+    ON CONFLICT (ISBN) DO UPDATE SET queued_at = excluded.queued_at;
+END
+"""
+
+
+class ReplicaDatabaseHandler(DatabaseHandler):
+    def __init__(
+        self,
+        path,
+        remote_url,
+        sync_interval=SYNC_INTERVAL,
+        batch_size=SYNC_BATCH_SIZE,
+        **kwargs,
+    ):
+        # Set before connecting: applying migrations already notifies.
+        self._sync_thread = None
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        super().__init__(f"sqlite:///{path}", **kwargs)
+
+        self.remote_url = remote_url
+        self.remote = None
+        self.sync_interval = sync_interval
+        self.batch_size = batch_size
+        self.online = False
+        self.last_sync = None
+        self.last_error = None
+        self._sync_lock = threading.Lock()
+
+        ReplicaBase.metadata.create_all(self.engine)
+        with self.engine.begin() as connection:
+            for name, (event, isbn, base_version) in OUTBOX_TRIGGERS.items():
+                connection.exec_driver_sql(
+                    OUTBOX_TRIGGER.format(
+                        name=name,
+                        event=event,
+                        isbn=isbn,
+                        base_version=base_version,
+                        now=SQLITE_NOW_MS,
+                    )
+                )
+            connection.execute(
+                sqlite.insert(SyncState.__table__)
+                .values(id=1, pulled_until=0, applying=0)
+                .on_conflict_do_nothing()
+            )
+
+    def dispose(self):
+        self.stop_sync()
+        if self.remote is not None:
+            self.remote.dispose()
+        super().dispose()
+
+    def notify_changes(self, kind, isbns=()):
+        super().notify_changes(kind, isbns)
+        if threading.current_thread() is not self._sync_thread:
+            self._wake.set()
+
+    def start_sync(self):
+        if self._sync_thread is not None:
+            return
+
+        self._stop.clear()
+        self._sync_thread = threading.Thread(
+            target=self._sync_loop, name="replica-sync", daemon=True
+        )
+        self._sync_thread.start()
+
+    def stop_sync(self):
+        if self._sync_thread is None:
+            return
+
+        self._stop.set()
+        self._wake.set()
+        self._sync_thread.join()
+        self._sync_thread = None
+
+    def _sync_loop(self):
+        while not self._stop.is_set():
+            try:
+                self.sync()
+            except Exception:
+                logger.exception("Replica sync failed")
+
+            woken = self._wake.wait(self.sync_interval)
+            self._wake.clear()
+            if woken:
+                self._stop.wait(SYNC_WRITE_DELAY)
+
+    def sync(self):
+        with self._sync_lock:
+            try:
+                if self.remote is None:
+                    self.remote = DatabaseHandler(self.remote_url)
+                stats = self.push()
+                stats.update(self.pull())
+            except SQLAlchemyError as e:
+                # Offline: reads keep working locally and the outbox waits.
+                self.online = False
+                self.last_error = str(e)
+                logger.warning("Replica sync failed: %s", e)
+                return None
+
+            self.online = True
+            self.last_sync = time.time()
+            self.last_error = None
+            return stats
+
+    def ping(self):
+        # The health check reports the server, not the local file, which
+        # answers even while every change is waiting in the outbox.
+        super().ping()
+        if not self.online or self.remote is None:
+            raise ReplicaOfflineError(
+                self.last_error or "Not synchronised with the server yet."
+            )
+        return self.remote.ping()
+
+    def sync_status(self):
+        with self.session_scope() as session:
+            pending = session.scalar(select(func.count()).select_from(OutboxEntry))
+            conflicts = session.scalar(select(func.count()).select_from(SyncConflict))
+        return {
+            "online": self.online,
+            "pending": pending,
+            "conflicts": conflicts,
+            "last_sync": self.last_sync,
+            "last_error": self.last_error,
+        }
+
+    def load_conflicts(self, limit=100):
+        with self.session_scope() as session:
+            return session.scalars(
+                select(SyncConflict).order_by(SyncConflict.id.desc()).limit(limit)
+            ).all()
+
+    @contextmanager
+    def _applying(self):
+        with self.session_scope() as session:
+            session.execute(update(SyncState).values(applying=1))
+            yield session
+            session.execute(update(SyncState).values(applying=0))
+
+    def _store_local(self, session, rows):
+        statement = sqlite.insert(Book.__table__)
+        statement = statement.on_conflict_do_update(
+            index_elements=["ISBN"],
+            set_={
+                name: statement.excluded[name]
+                for name in BOOK_FIELDS + ["version", "updated_at"]
+            },
+        )
+        session.execute(statement, rows)
+
+    def push(self):
+        stats = {"pushed": 0, "conflicts": 0}
+        last = None
+        while True:
+            statement = select(OutboxEntry).order_by(
+                OutboxEntry.queued_at, OutboxEntry.ISBN
+            )
+            if last is not None:
+                statement = statement.where(
+                    or_(
+                        OutboxEntry.queued_at > last.queued_at,
+                        and_(
+                            OutboxEntry.queued_at == last.queued_at,
+                            OutboxEntry.ISBN > last.ISBN,
+                        ),
+                    )
+                )
+            with self.session_scope() as session:
+                entries = session.scalars(statement.limit(self.batch_size)).all()
+            if not entries:
+                return stats
+
+            self._push_batch(entries, stats)
+            if len(entries) < self.batch_size:
+                return stats
+            last = entries[-1]
+
+    def _push_batch(self, entries, stats):
+        isbns = [entry.ISBN for entry in entries]
+        rows = select(Book.__table__).where(Book.ISBN.in_(isbns))
+        with self.session_scope() as session:
+            local = {row.ISBN: row._asdict() for row in session.execute(rows)}
+        with self.remote.session_scope() as session:
+            remote = {row.ISBN: row._asdict() for row in session.execute(rows)}
+            deleted_at = dict(
+                session.execute(
+                    select(BookTombstone.ISBN, func.max(BookTombstone.deleted_at))
+                    .where(BookTombstone.ISBN.in_(isbns))
+                    .group_by(BookTombstone.ISBN)
+                ).all()
+            )
+
+        outcomes = []
+        conflicts = []
+        with self.remote.session_scope() as session:
+            for entry in entries:
+                mine, theirs = local.get(entry.ISBN), remote.get(entry.ISBN)
+                if (
+                    theirs is not None
+                    and mine is not None
+                    and all(mine[name] == theirs[name] for name in BOOK_FIELDS)
+                ):
+                    # Both sides already agree; just adopt the remote version.
+                    outcomes.append((entry, theirs))
+                    continue
+                if mine is None and theirs is None:
+                    outcomes.append((entry, None))
+                    continue
+
+                winner = "local"
+                their_version = theirs["version"] if theirs else None
+                if their_version != entry.base_version:
+                    # Someone else changed the book since our first edit: the
+                    # most recent edit wins and the loser is kept in the log.
+                    mine_at = mine["updated_at"] if mine else entry.queued_at
+                    theirs_at = (
+                        theirs["updated_at"]
+                        if theirs
+                        else deleted_at.get(entry.ISBN, 0)
+                    )
+                    winner = "local" if mine_at >= theirs_at else "remote"
+                    conflicts.append((entry.ISBN, mine, theirs, winner))
+
+                if winner == "remote":
+                    outcomes.append((entry, theirs))
+                    continue
+
+                pushed = self._push_row(session, entry.ISBN, mine, theirs)
+                if pushed is not False:
+                    outcomes.append((entry, pushed))
+                    stats["pushed"] += 1
+
+        changed, removed = [], []
+        with self._applying() as session:
+            for entry, row in outcomes:
+                still_queued = session.execute(
+                    delete(OutboxEntry).where(
+                        OutboxEntry.ISBN == entry.ISBN,
+                        OutboxEntry.queued_at == entry.queued_at,
+                    )
+                ).rowcount
+                if not still_queued:
+                    # Edited again while pushing; the next push builds on the
+                    # version that is on the remote now.
+                    session.execute(
+                        update(OutboxEntry)
+                        .where(OutboxEntry.ISBN == entry.ISBN)
+                        .values(base_version=row["version"] if row else None)
+                    )
+                    continue
+
+                if row is None:
+                    if session.execute(
+                        delete(Book).where(Book.ISBN == entry.ISBN)
+                    ).rowcount:
+                        removed.append(entry.ISBN)
+                else:
+                    self._store_local(session, [row])
+                    changed.append(entry.ISBN)
+
+            resolved_at = now_ms()
+            for isbn, mine, theirs, winner in conflicts:
+                logger.warning("Sync conflict on %s, kept the %s edit", isbn, winner)
+                session.execute(
+                    insert(SyncConflict.__table__).values(
+                        ISBN=isbn,
+                        local=json.dumps(mine),
+                        remote=json.dumps(theirs),
+                        resolution=winner,
+                        resolved_at=resolved_at,
+                    )
+                )
+        stats["conflicts"] += len(conflicts)
+
+        if changed:
+            self.notify_changes(CHANGE_UPDATE, changed)
+        if removed:
+            self.notify_changes(CHANGE_DELETE, removed)
+
+    def _push_row(self, session, isbn, mine, theirs):
+        # Writes are conditional on the version read above; losing that race
+        # returns False and the entry is retried on the next sync.
+        now = now_ms()
+        if mine is None:
+            if theirs is not None:
+                if not session.execute(
+                    delete(Book).where(
+                        Book.ISBN == isbn, Book.version == theirs["version"]
+                    )
+                ).rowcount:
+                    return False
+                session.execute(
+                    insert(BookTombstone.__table__).values(ISBN=isbn, deleted_at=now)
+                )
+                self._record_push_history(session, isbn, CHANGE_DELETE, theirs, None)
+            return None
+
+        row = {name: mine[name] for name in BOOK_FIELDS}
+        row["version"] = (theirs["version"] if theirs else 0) + 1
+        row["updated_at"] = now
+        if theirs is None:
+            written = session.execute(
+                insert(Book.__table__)
+                .prefix_with("IGNORE", dialect="mysql")
+                .prefix_with("OR IGNORE", dialect="sqlite")
+                .values(ISBN=isbn, **row)
+            ).rowcount
+        else:
+            written = session.execute(
+                update(Book.__table__)
+                .where(Book.ISBN == isbn, Book.version == theirs["version"])
+                .values(row)
+            ).rowcount
+        if not written:
+            return False
+
+        action = CHANGE_INSERT if theirs is None else CHANGE_UPDATE
+        self._record_push_history(session, isbn, action, theirs, mine)
+        return {"ISBN": isbn, **row}
+
+    def _record_push_history(self, session, isbn, action, old, new):
+        # The server's change history covers pushed edits like local ones.
+        values = {"ISBN": isbn, "action": action, "changed_at": now_ms()}
+        for prefix, source in (("old", old), ("new", new)):
+            for name in BOOK_FIELDS:
+                values[f"{prefix}_{name}"] = source[name] if source else None
+        session.execute(insert(BookHistory.__table__).values(values))
+
+    def pull(self):
+        with self.session_scope() as session:
+            cursor = session.scalar(select(SyncState.pulled_until))
+        since = cursor - SYNC_OVERLAP_MS
+        stats = {"pulled": 0, "deleted": 0}
+
+        for tombstones in self._remote_batches(
+            select(BookTombstone.ISBN, BookTombstone.deleted_at, BookTombstone.id),
+            BookTombstone.deleted_at,
+            BookTombstone.id,
+            since,
+        ):
+            removed = []
+            with self._applying() as session:
+                pending = self._pending(session, [row.ISBN for row in tombstones])
+                for row in tombstones:
+                    # A newer row means the book was added again afterwards.
+                    if (
+                        row.ISBN not in pending
+                        and session.execute(
+                            delete(Book).where(
+                                Book.ISBN == row.ISBN, Book.updated_at <= row.deleted_at
+                            )
+                        ).rowcount
+                    ):
+                        removed.append(row.ISBN)
+                cursor = max(cursor, tombstones[-1].deleted_at)
+                session.execute(update(SyncState).values(pulled_until=cursor))
+            stats["deleted"] += len(removed)
+            if removed:
+                self.notify_changes(CHANGE_DELETE, removed)
+
+        for books in self._remote_batches(
+            select(Book.__table__), Book.updated_at, Book.ISBN, since
+        ):
+            isbns = [row.ISBN for row in books]
+            with self._applying() as session:
+                pending = self._pending(session, isbns)
+                versions = dict(
+                    session.execute(
+                        select(Book.ISBN, Book.version).where(Book.ISBN.in_(isbns))
+                    ).all()
+                )
+                fresh = [
+                    row._asdict()
+                    for row in books
+                    if row.ISBN not in pending and versions.get(row.ISBN) != row.version
+                ]
+                if fresh:
+                    self._store_local(session, fresh)
+                cursor = max(cursor, books[-1].updated_at)
+                session.execute(update(SyncState).values(pulled_until=cursor))
+            stats["pulled"] += len(fresh)
+            if fresh:
+                self.notify_changes(CHANGE_UPDATE, [row["ISBN"] for row in fresh])
+
+        return stats
+
+    def _pending(self, session, isbns):
+        pending = set()
+        for chunk in chunked(isbns, IN_CLAUSE_CHUNK_SIZE):
+            pending.update(
+                session.scalars(
+                    select(OutboxEntry.ISBN).where(OutboxEntry.ISBN.in_(chunk))
+                )
+            )
+        return pending
+
+    def _remote_batches(self, statement, time_column, key_column, since):
+        # Keyset pages over (time, key), oldest first, so the cursor can be
+        # saved after every batch.
+        statement = statement.where(time_column >= since).order_by(
+            time_column, key_column
+        )
+        last = None
+        while True:
+            page = statement
+            if last is not None:
+                page = page.where(
+                    or_(
+                        time_column > last[0],
+                        and_(time_column == last[0], key_column > last[1]),
+                    )
+                )
+            with self.remote.session_scope() as session:
+                rows = session.execute(page.limit(self.batch_size)).all()
+            if rows:
+                yield rows
+            if len(rows) < self.batch_size:
+                return
+            last = (
+                getattr(rows[-1], time_column.key),
+                getattr(rows[-1], key_column.key),
+            )
@@ -0,0 +1,78 @@
+import time
+import random
+import logging
+from functools import wraps
+from sqlalchemy.exc import DBAPIError, OperationalError
+from .instrumentation import metrics
+
+logger = logging.getLogger("pyqtlms.resilience")
+
+RETRY_ATTEMPTS = 3
+RETRY_BACKOFF = 0.05
+RETRY_MAX_BACKOFF = 1.0
+
+# MySQL lock wait timeout and deadlock: the server rolled the transaction back.
+MYSQL_ROLLED_BACK = {1205, 1213}
+# MySQL server gone away, lost connection and a dropped SSL connection.
+MYSQL_DISCONNECTED = {2006, 2013, 2055}
+SQLITE_BUSY_MESSAGES = ("database is locked", "database is busy")
+
+
+def error_code(error):
+    orig = error.orig
+    if (code := getattr(orig, "errno", None)) is not None:
+        return code
+    args = getattr(orig, "args", ())
+    return args[0] if args and isinstance(args[0], int) else None
+
+
+def is_rolled_back(error):
+    if not isinstance(error, OperationalError):
+        return False
+    if error_code(error) in MYSQL_ROLLED_BACK:
+        return True
+    message = str(error.orig).lower()
+    return any(busy in message for busy in SQLITE_BUSY_MESSAGES)
+
+
+def is_disconnect(error):
+    return error.connection_invalidated or error_code(error) in MYSQL_DISCONNECTED
+
+
+def is_transient(error, idempotent=True):
+    if not isinstance(error, DBAPIError):
+        return False
+    return is_rolled_back(error) or (idempotent and is_disconnect(error))
+
+
+def retry_transient(idempotent=True, attempts=RETRY_ATTEMPTS, backoff=RETRY_BACKOFF):
+    # Deadlocks and lock timeouts roll the whole transaction back, so any
+    # operation can run again. After a lost connection the commit may or may
+    # not have happened, so only idempotent operations are retried; SQLAlchemy
+    # has already invalidated the pool and the retry checks out a fresh one.
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            attempt = 0
+            while True:
+                try:
+                    return fn(*args, **kwargs)
+                except DBAPIError as e:
+                    attempt += 1
+                    if not is_transient(e, idempotent) or attempt >= attempts:
+                        raise
+
+                    delay = min(backoff * 2 ** (attempt - 1), RETRY_MAX_BACKOFF)
+                    delay *= random.uniform(0.5, 1)
+                    logger.warning(
+                        "Retrying %s in %.0f ms after: %s",
+                        fn.__name__,
+                        delay * 1000,
+                        e.orig,
+                    )
+                    metrics.record_span(f"db.retry.{fn.__name__}", delay)
+                    time.sleep(delay)
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,130 @@
+from operator import attrgetter
+from sqlalchemy import and_, or_
+from .models import Book
+
+SORT_COLUMNS = {
+    "isbn": Book.ISBN,
+    "title": Book.title,
+    "author": Book.author,
+    "year": Book.year_published,
+    "price": Book.price,
+}
+
+
+class BookQuery:
+    def __init__(
+        self,
+        text=None,
+        author=None,
+        year_min=None,
+        year_max=None,
+        price_min=None,
+        price_max=None,
+        sort_by="isbn",
+        descending=False,
+        full_text=False,
+    ):
+        if sort_by not in SORT_COLUMNS:
+            raise ValueError(f"Cannot sort by '{sort_by}'.")
+
+        self.text = text or None
+        self.author = author or None
+        self.year_min = year_min
+        self.year_max = year_max
+        self.price_min = price_min
+        self.price_max = price_max
+        self.sort_by = sort_by
+        self.descending = descending
+        self.full_text = full_text
+
+    def has_filters(self):
+        return any(
+            value is not None
+            for value in (
+                self.text,
+                self.author,
+                self.year_min,
+                self.year_max,
+                self.price_min,
+                self.price_max,
+            )
+        )
+
+    @property
+    def sort_column(self):
+        return SORT_COLUMNS[self.sort_by]
+
+    def apply(self, statement, dialect_name):
+        statement = self.filter(statement, dialect_name)
+
+        # ISBN breaks ties so that keyset pages are stable.
+        if self.descending:
+            return statement.order_by(self.sort_column.desc(), Book.ISBN.desc())
+        return statement.order_by(self.sort_column, Book.ISBN)
+
+    def filter(self, statement, dialect_name):
+        if self.text:
+            if self.full_text and dialect_name == "mysql":
+                # Served by the FULLTEXT index on title.
+                statement = statement.where(Book.title.match(self.text))
+            else:
+                pattern = f"%{self.text}%"
+                statement = statement.where(
+                    or_(Book.title.like(pattern), Book.author.like(pattern))
+                )
+        if self.author:
+            statement = statement.where(Book.author.like(f"%{self.author}%"))
+        if self.year_min is not None:
+            statement = statement.where(Book.year_published >= self.year_min)
+        if self.year_max is not None:
+            statement = statement.where(Book.year_published <= self.year_max)
+        if self.price_min is not None:
+            statement = statement.where(Book.price >= self.price_min)
+        if self.price_max is not None:
+            statement = statement.where(Book.price <= self.price_max)
+        return statement
+
+    def after(self, statement, last_book):
+        if last_book is None:
+            return statement
+
+        column = self.sort_column
+        value = getattr(last_book, column.key)
+        if column is Book.ISBN:
+            if self.descending:
+                return statement.where(Book.ISBN < value)
+            return statement.where(Book.ISBN > value)
+
+        if self.descending:
+            return statement.where(
+                or_(column < value, and_(column == value, Book.ISBN < last_book.ISBN))
+            )
+        return statement.where(
+            or_(column > value, and_(column == value, Book.ISBN > last_book.ISBN))
+        )
+
+    def matches(self, book):
+        if self.text:
+            text = self.text.lower()
+            if self.full_text:
+                if not any(word in book.title.lower() for word in text.split()):
+                    return False
+            elif text not in book.title.lower() and text not in book.author.lower():
+                return False
+        if self.author and self.author.lower() not in book.author.lower():
+            return False
+        if self.year_min is not None and book.year_published < self.year_min:
+            return False
+        if self.year_max is not None and book.year_published > self.year_max:
+            return False
+        if self.price_min is not None and book.price < self.price_min:
+            return False
+        if self.price_max is not None and book.price > self.price_max:
+            return False
+        return True
+
+    def sort_key(self, book):
+        return (getattr(book, self.sort_column.key), book.ISBN)
+
+    def sort_keys(self, books):
+        return list(map(attrgetter(self.sort_column.key, "ISBN"), books))
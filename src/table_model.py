@@ -0,0 +1,504 @@
+from bisect import bisect_left, bisect_right
+from operator import attrgetter
+from PyQt5.QtCore import (
+    Qt,
+    QAbstractTableModel,
+    QAbstractProxyModel,
+    QModelIndex,
+    QPersistentModelIndex,
+    pyqtSignal,
+)
+from .database import (
+    PAGE_SIZE,
+    CHANGE_INSERT,
+    CHANGE_UPDATE,
+    CHANGE_DELETE,
+    CHANGE_RESET,
+)
+from .search import BookQuery
+from .instrumentation import timed
+
+
+class BookTableModel(QAbstractTableModel):
+    HEADERS = ["ISBN", "Title", "Author", "Year", "Price"]
+    SORT_KEYS = ["isbn", "title", "author", "year", "price"]
+
+    pageLoaded = pyqtSignal()
+    loadFailed = pyqtSignal(object)
+
+    def __init__(
+        self, fetch_page, load_books, page_size=PAGE_SIZE, executor=None, parent=None
+    ):
+        super().__init__(parent)
+        self._fetch_page = fetch_page
+        self._load_books = load_books
+        self._page_size = page_size
+        self._executor = executor
+        self.query = BookQuery()
+        self._books = []
+        self._keys = []
+        self._loaded = {}
+        self._exhausted = False
+        self._fetching = False
+        self._generation = 0
+        self._load_token = 0
+        self._pending_loads = {}
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._books)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or role != Qt.DisplayRole:
+            return None
+
+        book = self._books[index.row()]
+        column = index.column()
+        if column == 0:
+            return book.ISBN
+        if column == 1:
+            return book.title
+        if column == 2:
+            return book.author
+        if column == 3:
+            return str(book.year_published)
+        if column == 4:
+            return book.price_display
+        return None
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return None
+        if orientation == Qt.Horizontal:
+            return self.HEADERS[section]
+        return str(section + 1)
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        sort_by = self.SORT_KEYS[column]
+        descending = order == Qt.DescendingOrder
+        if sort_by == self.query.sort_by and descending == self.query.descending:
+            return
+
+        self.query.sort_by = sort_by
+        self.query.descending = descending
+        if self.is_complete():
+            self._sort_loaded()
+        else:
+            self.reload()
+
+    @timed("ui.sort_loaded")
+    def _sort_loaded(self):
+        # Every matching book is already loaded, so reorder in memory by the
+        # typed sort keys instead of reloading from the database.
+        self.layoutAboutToBeChanged.emit()
+        keys = self.query.sort_keys(self._books)
+        order = sorted(
+            range(len(keys)), key=keys.__getitem__, reverse=self.query.descending
+        )
+        moved = {old: new for new, old in enumerate(order)}
+        self._books = [self._books[row] for row in order]
+        self._keys = [keys[row] for row in order]
+
+        previous = self.persistentIndexList()
+        self.changePersistentIndexList(
+            previous,
+            [self.index(moved[index.row()], index.column()) for index in previous],
+        )
+        self.layoutChanged.emit()
+
+    def books(self):
+        return self._books
+
+    def is_complete(self):
+        return self._exhausted and not self._fetching
+
+    def book_at(self, row):
+        if 0 <= row < len(self._books):
+            return self._books[row]
+        return None
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and not self._exhausted and not self._fetching
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid() or self._exhausted or self._fetching:
+            return
+
+        self._fetching = True
+        last_book = self._books[-1] if self._books else None
+        self._run(
+            self._fetch_page,
+            (self.query, last_book, self._page_size),
+            self._append_page,
+            on_error=self._fetch_failed,
+            key=("fetch", id(self)),
+        )
+
+    def is_fetching(self):
+        return self._fetching
+
+    def set_query(self, query):
+        self.query = query
+        self.reload()
+
+    def reload(self):
+        self._generation += 1
+        self.beginResetModel()
+        self._books = []
+        self._keys = []
+        self._loaded = {}
+        self._pending_loads = {}
+        self._exhausted = False
+        self._fetching = False
+        self.endResetModel()
+        self.fetchMore()
+
+    def _run(self, fn, args, callback, on_error=None, key=None):
+        generation = self._generation
+
+        def deliver(result):
+            # Results requested before a reload describe a table we no longer show.
+            if generation == self._generation:
+                callback(result)
+
+        if self._executor is None:
+            deliver(fn(*args))
+        else:
+            self._executor.submit(
+                fn,
+                *args,
+                on_result=deliver,
+                on_error=on_error or self.loadFailed.emit,
+                key=key,
+            )
+
+    def _fetch_failed(self, error):
+        self._fetching = False
+        self.loadFailed.emit(error)
+        self.pageLoaded.emit()
+
+    @timed("ui.append_page")
+    def _append_page(self, books):
+        self._fetching = False
+        if len(books) < self._page_size:
+            self._exhausted = True
+
+        if books:
+            first = len(self._books)
+            self.beginInsertRows(QModelIndex(), first, first + len(books) - 1)
+            self._books.extend(books)
+            self._keys.extend(self.query.sort_keys(books))
+            self._loaded.update((book.ISBN, book) for book in books)
+            self.endInsertRows()
+
+        self.pageLoaded.emit()
+
+    def apply_change(self, kind, isbns):
+        if kind == CHANGE_RESET:
+            self.reload()
+            return
+
+        if kind == CHANGE_DELETE:
+            for isbn in isbns:
+                self._remove_book(isbn)
+        elif kind in (CHANGE_INSERT, CHANGE_UPDATE) and isbns:
+            self._refresh_books(isbns)
+
+    def _position(self, key):
+        low, high = 0, len(self._keys)
+        while low < high:
+            middle = (low + high) // 2
+            current = self._keys[middle]
+            if (current > key) if self.query.descending else (current < key):
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def _find_row(self, isbn):
+        if (book := self._loaded.get(isbn)) is None:
+            return None
+        return self._position(self.query.sort_key(book))
+
+    def _refresh_books(self, isbns):
+        self._load_token += 1
+        token = self._load_token
+        for isbn in isbns:
+            self._pending_loads[isbn] = token
+
+        self._run(
+            self._load_books,
+            (isbns,),
+            lambda books: self._apply_books(token, isbns, books),
+        )
+
+    def _apply_books(self, token, isbns, books):
+        loaded = {book.ISBN: book for book in books}
+        for isbn in isbns:
+            # A newer load for this ISBN may already be in flight.
+            if self._pending_loads.get(isbn) == token:
+                del self._pending_loads[isbn]
+                self._apply_book(isbn, loaded.get(isbn))
+
+    def _apply_book(self, isbn, book):
+        if book is None or not self.query.matches(book):
+            self._remove_book(isbn)
+            return
+
+        key = self.query.sort_key(book)
+        if (row := self._find_row(isbn)) is not None and self._keys[row] == key:
+            self._books[row] = book
+            self._loaded[isbn] = book
+            self.dataChanged.emit(
+                self.index(row, 0), self.index(row, self.columnCount() - 1)
+            )
+            return
+
+        # The sort key changed (or the book is new), so it may move.
+        self._remove_book(isbn)
+
+        position = self._position(key)
+        if position == len(self._keys) and not self._exhausted:
+            # Beyond the loaded window; fetchMore will pick it up in order.
+            return
+
+        self.beginInsertRows(QModelIndex(), position, position)
+        self._books.insert(position, book)
+        self._keys.insert(position, key)
+        self._loaded[isbn] = book
+        self.endInsertRows()
+
+    def _remove_book(self, isbn):
+        row = self._find_row(isbn)
+        if row is None:
+            return
+
+        self.beginRemoveRows(QModelIndex(), row, row)
+        del self._books[row]
+        del self._keys[row]
+        del self._loaded[isbn]
+        self.endRemoveRows()
+
+
+def book_haystack(book):
+    return f"{book.ISBN}\n{book.title}\n{book.author}\n{book.year_published}".lower()
+
+
+def filter_terms(text):
+    return tuple(dict.fromkeys(text.lower().split()))
+
+
+def narrows(previous, terms):
+    # Rows matching the new terms are a subset of the rows matching the old
+    # ones, so the new filter only needs to scan the current matches.
+    return all(any(old in term for term in terms) for old in previous)
+
+
+class BookFilterProxyModel(QAbstractProxyModel):
+    # As-you-type filter over the books already loaded by BookTableModel. The
+    # proxy keeps the accepted source rows in ascending order, so mapping is a
+    # list lookup one way and a bisect the other. Lower-cased search text is
+    # kept per source row, a filter that extends the previous one only rescans
+    # the rows that still match, and results are remembered until the source
+    # changes so deleting characters is free.
+
+    def __init__(self, source_model, parent=None):
+        super().__init__(parent)
+        self._terms = ()
+        self._rows = []
+        self._haystacks = []
+        self._results = {}
+        self._layout_sources = []
+        self._layout_haystacks = {}
+        self.setSourceModel(source_model)
+
+        source_model.modelAboutToBeReset.connect(self.beginResetModel)
+        source_model.modelReset.connect(self._on_source_reset)
+        source_model.rowsInserted.connect(self._on_rows_inserted)
+        source_model.rowsRemoved.connect(self._on_rows_removed)
+        source_model.dataChanged.connect(self._on_data_changed)
+        source_model.layoutAboutToBeChanged.connect(self._on_layout_about_to_change)
+        source_model.layoutChanged.connect(self._on_layout_changed)
+        self._on_source_reset()
+
+    def is_filtered(self):
+        return bool(self._terms)
+
+    @timed("ui.filter_books")
+    def set_filter_text(self, text):
+        terms = filter_terms(text)
+        if terms == self._terms:
+            return
+
+        if (rows := self._results.get(terms)) is None:
+            if narrows(self._terms, terms):
+                candidates = self._rows
+            else:
+                candidates = range(len(self._haystacks))
+            rows = self._results[terms] = self._filter_rows(candidates, terms)
+        self._terms = terms
+
+        self.layoutAboutToBeChanged.emit()
+        previous = self.persistentIndexList()
+        sources = [self._rows[index.row()] for index in previous]
+        self._rows = rows
+        self.changePersistentIndexList(
+            previous,
+            [
+                self._index_for_source_row(row, index.column())
+                for row, index in zip(sources, previous)
+            ],
+        )
+        self.layoutChanged.emit()
+
+    def _filter_rows(self, candidates, terms=None):
+        terms = self._terms if terms is None else terms
+        haystacks = self._haystacks
+        rows = list(candidates)
+        for term in terms:
+            rows = [row for row in rows if term in haystacks[row]]
+        return rows
+
+    def _source_changed(self):
+        self._results = {}
+
+    def _position(self, source_row):
+        position = bisect_left(self._rows, source_row)
+        if position < len(self._rows) and self._rows[position] == source_row:
+            return position
+        return None
+
+    def _index_for_source_row(self, source_row, column):
+        if (position := self._position(source_row)) is None:
+            return QModelIndex()
+        return self.index(position, column)
+
+    def book_at(self, row):
+        if 0 <= row < len(self._rows):
+            return self.sourceModel().book_at(self._rows[row])
+        return None
+
+    def index(self, row, column, parent=QModelIndex()):
+        if parent.isValid() or not self.hasIndex(row, column, parent):
+            return QModelIndex()
+        return self.createIndex(row, column)
+
+    def parent(self, index=QModelIndex()):
+        return QModelIndex()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self.sourceModel().columnCount()
+
+    def mapToSource(self, index):
+        if not index.isValid() or index.row() >= len(self._rows):
+            return QModelIndex()
+        return self.sourceModel().index(self._rows[index.row()], index.column())
+
+    def mapFromSource(self, source_index):
+        if not source_index.isValid():
+            return QModelIndex()
+        return self._index_for_source_row(source_index.row(), source_index.column())
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Horizontal:
+            return self.sourceModel().headerData(section, orientation, role)
+        if role != Qt.DisplayRole:
+            return None
+        return str(section + 1)
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        self.sourceModel().sort(column, order)
+
+    def _on_source_reset(self):
+        self._source_changed()
+        self._haystacks = [book_haystack(book) for book in self.sourceModel().books()]
+        self._rows = self._filter_rows(range(len(self._haystacks)))
+        self.endResetModel()
+
+    def _on_rows_inserted(self, parent, first, last):
+        self._source_changed()
+        count = last - first + 1
+        books = self.sourceModel().books()
+        self._haystacks[first:first] = [
+            book_haystack(book) for book in books[first : last + 1]
+        ]
+
+        position = bisect_left(self._rows, first)
+        if position < len(self._rows):
+            self._rows[position:] = [row + count for row in self._rows[position:]]
+
+        if accepted := self._filter_rows(range(first, last + 1)):
+            self.beginInsertRows(QModelIndex(), position, position + len(accepted) - 1)
+            self._rows[position:position] = accepted
+            self.endInsertRows()
+
+    def _on_rows_removed(self, parent, first, last):
+        self._source_changed()
+        count = last - first + 1
+        del self._haystacks[first : last + 1]
+
+        low = bisect_left(self._rows, first)
+        high = bisect_right(self._rows, last)
+        if high > low:
+            self.beginRemoveRows(QModelIndex(), low, high - 1)
+            del self._rows[low:high]
+            self.endRemoveRows()
+        if low < len(self._rows):
+            self._rows[low:] = [row - count for row in self._rows[low:]]
+
+    def _on_data_changed(self, top_left, bottom_right, roles=()):
+        self._source_changed()
+        books = self.sourceModel().books()
+        for row in range(top_left.row(), bottom_right.row() + 1):
+            self._haystacks[row] = book_haystack(books[row])
+            accepted = bool(self._filter_rows((row,)))
+            position = self._position(row)
+            if accepted and position is not None:
+                self.dataChanged.emit(
+                    self.index(position, 0),
+                    self.index(position, self.columnCount() - 1),
+                )
+            elif accepted:
+                position = bisect_left(self._rows, row)
+                self.beginInsertRows(QModelIndex(), position, position)
+                self._rows.insert(position, row)
+                self.endInsertRows()
+            elif position is not None:
+                self.beginRemoveRows(QModelIndex(), position, position)
+                del self._rows[position]
+                self.endRemoveRows()
+
+    def _on_layout_about_to_change(self):
+        self.layoutAboutToBeChanged.emit()
+        self._layout_sources = [
+            (index, QPersistentModelIndex(self.mapToSource(index)))
+            for index in self.persistentIndexList()
+        ]
+        isbns = map(attrgetter("ISBN"), self.sourceModel().books())
+        self._layout_haystacks = dict(zip(isbns, self._haystacks))
+
+    def _on_layout_changed(self):
+        self._source_changed()
+        haystacks = self._layout_haystacks
+        self._haystacks = [
+            haystacks[book.ISBN] if book.ISBN in haystacks else book_haystack(book)
+            for book in self.sourceModel().books()
+        ]
+        self._rows = self._filter_rows(range(len(self._haystacks)))
+
+        previous = [index for index, _ in self._layout_sources]
+        current = [
+            self.mapFromSource(self.sourceModel().index(source.row(), source.column()))
+            if source.isValid()
+            else QModelIndex()
+            for _, source in self._layout_sources
+        ]
+        self.changePersistentIndexList(previous, current)
+        self._layout_sources = []
+        self._layout_haystacks = {}
+        self.layoutChanged.emit()
@@ -0,0 +1,130 @@
+import os
+import csv
+import json
+import time
+from .utils import validate_book
+
+IMPORT_CHUNK_SIZE = 2000
+EXPORT_BATCH_SIZE = 5000
+MAX_REPORTED_ERRORS = 100
+
+FIELDS = ["ISBN", "title", "author", "year_published", "price"]
+FORMATS = {".csv": "csv", ".jsonl": "jsonl", ".ndjson": "jsonl"}
+
+
+class TransferStats:
+    def __init__(self):
+        self.rows = 0
+        self.rejected = 0
+        self.errors = []
+        self.started = time.perf_counter()
+        self.stopped = None
+
+    def stop(self):
+        self.stopped = time.perf_counter()
+        return self
+
+    @property
+    def elapsed(self):
+        # Progress reports read the rate while the transfer is still running.
+        return (self.stopped or time.perf_counter()) - self.started
+
+    @property
+    def rate(self):
+        return self.rows / self.elapsed if self.elapsed else 0.0
+
+    def __str__(self):
+        return f"{self.rows} rows in {self.elapsed:.2f}s ({self.rate:,.0f} rows/s)"
+
+
+def detect_format(path, file_format=None):
+    if file_format:
+        return file_format
+
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in FORMATS:
+        raise ValueError(f"Cannot detect the file format of '{path}'.")
+    return FORMATS[extension]
+
+
+def read_records(path, file_format):
+    with open(path, newline="", encoding="utf-8") as source:
+        if file_format == "csv":
+            for line_number, record in enumerate(csv.DictReader(source), start=2):
+                yield line_number, record
+        else:
+            for line_number, line in enumerate(source, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    yield line_number, json.loads(line)
+                except ValueError:
+                    yield line_number, None
+
+
+def import_books(
+    db_handler, path, file_format=None, chunk_size=IMPORT_CHUNK_SIZE, progress=None
+):
+    file_format = detect_format(path, file_format)
+    stats = TransferStats()
+    chunk = []
+
+    for line_number, record in read_records(path, file_format):
+        try:
+            if not isinstance(record, dict):
+                raise ValueError("Malformed record.")
+            isbn, title, author, year, price = validate_book(
+                *(str(record.get(field) or "").strip() for field in FIELDS)
+            )
+        except ValueError as e:
+            stats.rejected += 1
+            if len(stats.errors) < MAX_REPORTED_ERRORS:
+                stats.errors.append((line_number, str(e)))
+            continue
+
+        chunk.append(
+            {
+                "ISBN": isbn,
+                "title": title,
+                "author": author,
+                "year_published": year,
+                "price": price,
+            }
+        )
+        if len(chunk) >= chunk_size:
+            db_handler.upsert_books(chunk)
+            stats.rows += len(chunk)
+            chunk = []
+            if progress:
+                progress(stats)
+
+    if chunk:
+        db_handler.upsert_books(chunk)
+        stats.rows += len(chunk)
+
+    return stats.stop()
+
+
+def export_books(
+    db_handler, path, file_format=None, batch_size=EXPORT_BATCH_SIZE, progress=None
+):
+    file_format = detect_format(path, file_format)
+    stats = TransferStats()
+
+    with open(path, "w", newline="", encoding="utf-8") as target:
+        if file_format == "csv":
+            writer = csv.writer(target)
+            writer.writerow(FIELDS)
+            write = writer.writerow
+        else:
+
+            def write(row):
+                target.write(json.dumps(dict(zip(FIELDS, row))) + "\n")
+
+        for row in db_handler.stream_book_rows(batch_size):
+            write(row)
+            stats.rows += 1
+            if progress and stats.rows % batch_size == 0:
+                progress(stats)
+
+    return stats.stop()
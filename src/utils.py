@@ -0,0 +1,32 @@
+ISBN_LENGTH = 20
+TITLE_LENGTH = 255
+AUTHOR_LENGTH = 100
+
+
+def format_idr(value):
+    try:
+        num_value = float(value)
+        return "Rp {:,.0f}".format(num_value).replace(",", ".")
+    except ValueError:
+        return "Invalid Value"
+
+
+def validate_book(isbn, title, author, year, price):
+    if not isbn or not title or not author or not year or not price:
+        raise ValueError("All fields must be filled.")
+
+    if len(isbn) > ISBN_LENGTH:
+        raise ValueError(f"ISBN must be at most {ISBN_LENGTH} characters.")
+    if len(title) > TITLE_LENGTH:
+        raise ValueError(f"Title must be at most {TITLE_LENGTH} characters.")
+    if len(author) > AUTHOR_LENGTH:
+        raise ValueError(f"Author must be at most {AUTHOR_LENGTH} characters.")
+
+    year = int(year)
+    price = int(price)
+    if year < 1900 or year > 2024:
+        raise ValueError("Year must be between 1900 and 2024.")
+    if price <= 0 or price > 1000000:
+        raise ValueError("Price must be greater than 0 and less than 1000000.")
+
+    return isbn, title, author, year, price
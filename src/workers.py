@@ -0,0 +1,94 @@
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+from .instrumentation import metrics
+
+
+class DbTaskSignals(QObject):
+    finished = pyqtSignal(object)
+    failed = pyqtSignal(object)
+
+
+class DbTask(QRunnable):
+    def __init__(self, fn, args, kwargs, key=None):
+        super().__init__()
+        self.setAutoDelete(False)
+        self.key = key
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.cancelled = False
+        self.signals = DbTaskSignals()
+
+    def run(self):
+        if self.cancelled:
+            # Cancelled after tryTake could no longer withdraw it; the executor
+            # still has to release the task, and skips the callback.
+            self.signals.finished.emit(None)
+            return
+
+        try:
+            with metrics.span(f"db.{getattr(self.fn, '__name__', 'task')}"):
+                result = self.fn(*self.args, **self.kwargs)
+        except Exception as e:
+            self.signals.failed.emit(e)
+            return
+
+        self.signals.finished.emit(result)
+
+
+class DbExecutor(QObject):
+    def __init__(self, max_threads=4, parent=None):
+        super().__init__(parent)
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(max_threads)
+        self._tasks = set()
+        self._latest = {}
+
+    def submit(self, fn, *args, on_result=None, on_error=None, key=None, **kwargs):
+        task = DbTask(fn, args, kwargs, key)
+
+        if key is not None:
+            if previous := self._latest.get(key):
+                self.cancel(previous)
+            self._latest[key] = task
+
+        task.signals.finished.connect(
+            lambda result: self._deliver(task, on_result, result)
+        )
+        task.signals.failed.connect(lambda error: self._deliver(task, on_error, error))
+
+        self._tasks.add(task)
+        self.pool.start(task)
+        return task
+
+    def cancel(self, task):
+        task.cancelled = True
+        if self.pool.tryTake(task):
+            self._release(task)
+
+    def cancel_keyed(self):
+        # Keyed tasks are reads a newer request would supersede anyway; writes
+        # are never keyed, so they still run.
+        for task in list(self._latest.values()):
+            self.cancel(task)
+
+    def wait_for_done(self, msecs=-1):
+        return self.pool.waitForDone(msecs)
+
+    def _deliver(self, task, callback, value):
+        self._release(task)
+        if not task.cancelled and callback is not None:
+            callback(value)
+
+    def _release(self, task):
+        self._tasks.discard(task)
+        if task.key is not None and self._latest.get(task.key) is task:
+            del self._latest[task.key]
+
+
+class ChangeNotifier(QObject):
+    # DatabaseHandler listeners run on whichever thread made the change; this
+    # re-emits them as a signal so connected slots run on the GUI thread.
+    changed = pyqtSignal(str, list)
+
+    def notify(self, kind, isbns):
+        self.changed.emit(kind, list(isbns))
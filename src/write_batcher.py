@@ -0,0 +1,188 @@
+from threading import Lock
+from .models import Book
+from .resilience import is_transient
+
+WRITE_BATCH_SIZE = 500
+REPORTED_FAILURES = 10
+
+INSERT = "insert"
+UPDATE = "update"
+DELETE = "delete"
+REPLACE = "replace"
+
+# (queued operation, new operation) -> coalesced operation; None drops the
+# entry. A replace is a delete followed by an insert of the same ISBN.
+COALESCE = {
+    (INSERT, UPDATE): INSERT,
+    (INSERT, DELETE): None,
+    (UPDATE, UPDATE): UPDATE,
+    (UPDATE, DELETE): DELETE,
+    (DELETE, INSERT): REPLACE,
+    (DELETE, DELETE): DELETE,
+    (REPLACE, UPDATE): REPLACE,
+    (REPLACE, DELETE): DELETE,
+}
+
+
+def coalesce(isbn, current, operation, values):
+    queued, queued_values = current
+    if (queued, operation) not in COALESCE:
+        raise ValueError(f"Cannot {operation} book {isbn} with a pending {queued}.")
+    if (merged := COALESCE[queued, operation]) is None:
+        return None
+    return merged, values if values is not None else queued_values
+
+
+class WriteBatchError(Exception):
+    def __init__(self, failures):
+        self.failures = failures
+        isbns = ", ".join(list(failures)[:REPORTED_FAILURES])
+        if len(failures) > REPORTED_FAILURES:
+            isbns += f" and {len(failures) - REPORTED_FAILURES} more"
+        error = next(iter(failures.values()))
+        super().__init__(
+            f"Discarded {len(failures)} queued changes that could not be saved "
+            f"({isbns}): {error}"
+        )
+
+
+def book_values(title, author, year, price):
+    return {"title": title, "author": author, "year_published": year, "price": price}
+
+
+class WriteBatcher:
+    # Queues interactive edits per ISBN and writes them in one transaction.
+    # It mirrors the DatabaseHandler write methods so callers can switch
+    # between immediate and batched writes.
+    def __init__(self, db_handler, max_pending=WRITE_BATCH_SIZE):
+        self.db_handler = db_handler
+        self.max_pending = max_pending
+        self._pending = {}
+        self._lock = Lock()
+        self._flush_lock = Lock()
+        self._insert_lock = Lock()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._pending)
+
+    def is_full(self):
+        return len(self) >= self.max_pending
+
+    def _queue(self, isbn, operation, values=None):
+        with self._lock:
+            if (current := self._pending.get(isbn)) is None:
+                self._pending[isbn] = (operation, values)
+            elif (merged := coalesce(isbn, current, operation, values)) is None:
+                del self._pending[isbn]
+            else:
+                self._pending[isbn] = merged
+
+    def _pending_state(self, isbn):
+        with self._lock:
+            return self._pending.get(isbn)
+
+    def insert_book(self, isbn, title, author, year, price):
+        self._queue(isbn, INSERT, book_values(title, author, year, price))
+
+    def insert_new_book(self, isbn, title, author, year, price):
+        # Serialised so two quick adds of the same ISBN cannot both pass the
+        # duplicate check before either is queued.
+        with self._insert_lock:
+            if self.is_isbn_duplicate(isbn):
+                return False
+            self.insert_book(isbn, title, author, year, price)
+            return True
+
+    def update_book(self, isbn, title, author, year, price):
+        self._queue(isbn, UPDATE, book_values(title, author, year, price))
+
+    def delete_book(self, isbn):
+        self._queue(isbn, DELETE)
+
+    def delete_books(self, isbns):
+        isbns = list(dict.fromkeys(isbns))
+        for isbn in isbns:
+            self._queue(isbn, DELETE)
+        return len(isbns)
+
+    def load_book_by_isbn(self, isbn):
+        if (state := self._pending_state(isbn)) is None:
+            return self.db_handler.load_book_by_isbn(isbn)
+        operation, values = state
+        if operation == DELETE:
+            return None
+        return Book(ISBN=isbn, **values)
+
+    def is_isbn_duplicate(self, isbn):
+        if (state := self._pending_state(isbn)) is None:
+            return self.db_handler.is_isbn_duplicate(isbn)
+        return state[0] != DELETE
+
+    def discard(self):
+        with self._lock:
+            self._pending = {}
+
+    def flush(self):
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+            if not pending:
+                return 0
+
+            try:
+                self._apply(pending)
+            except Exception as e:
+                if is_transient(e):
+                    self._restore(pending)
+                    raise
+                # Something in the batch can never be written. Save the rest
+                # one change at a time and drop the changes that fail.
+                self._apply_each(pending)
+            return len(pending)
+
+    def _apply(self, pending):
+        inserts, updates, deletes = [], [], []
+        for isbn, (operation, values) in pending.items():
+            if operation in (DELETE, REPLACE):
+                deletes.append(isbn)
+            if operation in (INSERT, REPLACE):
+                inserts.append({"ISBN": isbn, **values})
+            elif operation == UPDATE:
+                updates.append({"ISBN": isbn, **values})
+        self.db_handler.apply_changes(inserts, updates, deletes)
+
+    def _apply_each(self, pending):
+        failures = {}
+        entries = list(pending.items())
+        for position, (isbn, entry) in enumerate(entries):
+            try:
+                self._apply({isbn: entry})
+            except Exception as e:
+                if not is_transient(e):
+                    failures[isbn] = e
+                    continue
+                self._restore(dict(entries[position:]))
+                if failures:
+                    raise WriteBatchError(failures) from e
+                raise
+        if failures:
+            raise WriteBatchError(failures)
+
+    def _restore(self, pending):
+        # Put a failed batch back underneath any edits queued since the flush
+        # started, so the next flush retries it.
+        with self._lock:
+            newer, self._pending = self._pending, dict(pending)
+            for isbn, (operation, values) in newer.items():
+                if (current := self._pending.get(isbn)) is None:
+                    self._pending[isbn] = (operation, values)
+                    continue
+                try:
+                    merged = coalesce(isbn, current, operation, values)
+                except ValueError:
+                    merged = (operation, values)
+                if merged is None:
+                    del self._pending[isbn]
+                else:
+                    self._pending[isbn] = merged
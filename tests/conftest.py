@@ -0,0 +1,36 @@
+import pytest
+from src.database import DatabaseHandler
+from src.replica import ReplicaDatabaseHandler
+
+
+@pytest.fixture
+def db_handler(tmp_path):
+    handler = DatabaseHandler(f"sqlite:///{tmp_path / 'books.db'}")
+    yield handler
+    handler.dispose()
+
+
+@pytest.fixture
+def remote_url(tmp_path):
+    return f"sqlite:///{tmp_path / 'remote.db'}"
+
+
+@pytest.fixture
+def remote(remote_url):
+    handler = DatabaseHandler(remote_url)
+    yield handler
+    handler.dispose()
+
+
+@pytest.fixture
+def make_replica(tmp_path, remote, remote_url):
+    replicas = []
+
+    def make(name="replica"):
+        replica = ReplicaDatabaseHandler(tmp_path / f"{name}.db", remote_url)
+        replicas.append(replica)
+        return replica
+
+    yield make
+    for replica in replicas:
+        replica.dispose()
@@ -0,0 +1,98 @@
+import time
+
+
+def test_push_sends_local_writes(remote, make_replica):
+    replica = make_replica()
+    replica.insert_book("111", "Local", "Author", 2000, 100)
+
+    stats = replica.sync()
+
+    assert stats["pushed"] == 1
+    assert remote.load_book_by_isbn("111").title == "Local"
+    assert replica.sync_status()["pending"] == 0
+    assert replica.sync_status()["online"]
+
+
+def test_pull_receives_remote_writes(remote, make_replica):
+    replica = make_replica()
+    replica.sync()
+    remote.insert_book("222", "Remote", "Author", 2001, 50)
+
+    stats = replica.sync()
+
+    assert stats["pulled"] == 1
+    assert replica.load_book_by_isbn("222").title == "Remote"
+    assert replica.sync_status()["pending"] == 0
+
+
+def test_edits_travel_between_replicas(make_replica):
+    first, second = make_replica("first"), make_replica("second")
+    first.insert_book("333", "Draft", "Author", 2002, 10)
+    first.sync()
+    second.sync()
+
+    second.update_book("333", "Final", "Author", 2002, 12)
+    second.sync()
+    first.sync()
+
+    assert first.load_book_by_isbn("333").title == "Final"
+    assert first.load_book_by_isbn("333").price == 12
+
+
+def test_deletions_are_pulled(remote, make_replica):
+    replica = make_replica()
+    remote.insert_book("444", "Gone", "Author", 2003, 20)
+    replica.sync()
+
+    remote.delete_book("444")
+    stats = replica.sync()
+
+    assert stats["deleted"] == 1
+    assert replica.load_book_by_isbn("444") is None
+
+
+def test_conflict_keeps_the_most_recent_edit(remote, make_replica):
+    replica = make_replica()
+    remote.insert_book("555", "Original", "Author", 2004, 30)
+    replica.sync()
+
+    remote.update_book("555", "Remote edit", "Author", 2004, 30)
+    time.sleep(0.01)
+    replica.update_book("555", "Local edit", "Author", 2004, 30)
+    stats = replica.sync()
+
+    assert stats["conflicts"] == 1
+    assert remote.load_book_by_isbn("555").title == "Local edit"
+    assert replica.load_book_by_isbn("555").title == "Local edit"
+    conflict = replica.load_conflicts()[0]
+    assert conflict.ISBN == "555"
+    assert conflict.resolution == "local"
+    assert "Remote edit" in conflict.remote
+
+
+def test_conflict_loses_to_a_newer_remote_edit(remote, make_replica):
+    replica = make_replica()
+    remote.insert_book("666", "Original", "Author", 2005, 40)
+    replica.sync()
+
+    replica.update_book("666", "Local edit", "Author", 2005, 40)
+    time.sleep(0.01)
+    remote.update_book("666", "Remote edit", "Author", 2005, 40)
+    stats = replica.sync()
+
+    assert stats["conflicts"] == 1
+    assert remote.load_book_by_isbn("666").title == "Remote edit"
+    assert replica.load_book_by_isbn("666").title == "Remote edit"
+    assert replica.load_conflicts()[0].resolution == "remote"
+    assert replica.sync_status()["pending"] == 0
+
+
+def test_unreachable_server_keeps_the_outbox(tmp_path, make_replica):
+    replica = make_replica()
+    replica.remote_url = f"sqlite:///{tmp_path / 'missing' / 'remote.db'}"
+    replica.insert_book("777", "Offline", "Author", 2006, 60)
+
+    assert replica.sync() is None
+    assert not replica.sync_status()["online"]
+    assert replica.sync_status()["pending"] == 1
+    assert replica.load_book_by_isbn("777").title == "Offline"
@@ -0,0 +1,122 @@
+import pytest
+from sqlalchemy.exc import OperationalError
+from src.write_batcher import (
+    WriteBatcher,
+    WriteBatchError,
+    INSERT,
+    UPDATE,
+    DELETE,
+    REPLACE,
+    coalesce,
+    book_values,
+)
+
+VALUES = book_values("Title", "Author", 2000, 100)
+NEWER = book_values("Newer", "Author", 2001, 120)
+
+
+@pytest.mark.parametrize(
+    "queued, operation, expected",
+    [
+        (INSERT, UPDATE, (INSERT, NEWER)),
+        (INSERT, DELETE, None),
+        (UPDATE, UPDATE, (UPDATE, NEWER)),
+        (UPDATE, DELETE, (DELETE, VALUES)),
+        (DELETE, INSERT, (REPLACE, NEWER)),
+        (DELETE, DELETE, (DELETE, VALUES)),
+        (REPLACE, UPDATE, (REPLACE, NEWER)),
+        (REPLACE, DELETE, (DELETE, VALUES)),
+    ],
+)
+def test_coalesce(queued, operation, expected):
+    values = None if operation == DELETE else NEWER
+    assert coalesce("111", (queued, VALUES), operation, values) == expected
+
+
+@pytest.mark.parametrize(
+    "queued, operation",
+    [(INSERT, INSERT), (UPDATE, INSERT), (REPLACE, INSERT), (DELETE, UPDATE)],
+)
+def test_coalesce_rejects_impossible_sequences(queued, operation):
+    with pytest.raises(ValueError):
+        coalesce("111", (queued, VALUES), operation, NEWER)
+
+
+def test_edits_to_one_book_coalesce(db_handler):
+    batcher = WriteBatcher(db_handler)
+    batcher.insert_book("111", "Title", "Author", 2000, 100)
+    batcher.update_book("111", "Newer", "Author", 2001, 120)
+
+    assert len(batcher) == 1
+    assert batcher.load_book_by_isbn("111").title == "Newer"
+    assert db_handler.load_book_by_isbn("111") is None
+
+    assert batcher.flush() == 1
+    assert len(batcher) == 0
+    assert db_handler.load_book_by_isbn("111").title == "Newer"
+
+
+def test_insert_then_delete_writes_nothing(db_handler):
+    batcher = WriteBatcher(db_handler)
+    batcher.insert_book("111", "Title", "Author", 2000, 100)
+    batcher.delete_book("111")
+
+    assert len(batcher) == 0
+    assert batcher.flush() == 0
+    assert db_handler.load_history(isbn="111") == []
+
+
+def test_delete_then_insert_replaces(db_handler):
+    db_handler.insert_book("111", "Title", "Author", 2000, 100)
+    batcher = WriteBatcher(db_handler)
+    batcher.delete_book("111")
+    assert not batcher.is_isbn_duplicate("111")
+
+    batcher.insert_book("111", "Newer", "Author", 2001, 120)
+    batcher.flush()
+
+    assert db_handler.load_book_by_isbn("111").title == "Newer"
+
+
+def test_insert_new_book_rejects_duplicates(db_handler):
+    db_handler.insert_book("111", "Title", "Author", 2000, 100)
+    batcher = WriteBatcher(db_handler)
+
+    assert not batcher.insert_new_book("111", "Title", "Author", 2000, 100)
+    assert batcher.insert_new_book("222", "Title", "Author", 2000, 100)
+    assert not batcher.insert_new_book("222", "Title", "Author", 2000, 100)
+    assert len(batcher) == 1
+
+
+def test_transient_failure_requeues_the_batch(db_handler, monkeypatch):
+    batcher = WriteBatcher(db_handler)
+    batcher.insert_book("111", "Title", "Author", 2000, 100)
+
+    def locked(*args):
+        raise OperationalError("INSERT", {}, Exception("database is locked"))
+
+    monkeypatch.setattr(db_handler, "apply_changes", locked)
+    with pytest.raises(OperationalError):
+        batcher.flush()
+    batcher.update_book("111", "Newer", "Author", 2001, 120)
+    monkeypatch.undo()
+
+    assert len(batcher) == 1
+    assert batcher.flush() == 1
+    assert db_handler.load_book_by_isbn("111").title == "Newer"
+
+
+def test_failing_change_is_dropped_and_reported(db_handler):
+    db_handler.insert_book("111", "Title", "Author", 2000, 100)
+    batcher = WriteBatcher(db_handler)
+    # Queued without the duplicate check, as if another client added it first.
+    batcher.insert_book("111", "Duplicate", "Author", 2000, 100)
+    batcher.insert_book("222", "Other", "Author", 2000, 100)
+
+    with pytest.raises(WriteBatchError) as error:
+        batcher.flush()
+
+    assert list(error.value.failures) == ["111"]
+    assert len(batcher) == 0
+    assert db_handler.load_book_by_isbn("111").title == "Title"
+    assert db_handler.load_book_by_isbn("222").title == "Other"